@@ -2,12 +2,18 @@
 AI API endpoints for model management and inference
 """
 from ninja import Router, Schema
-from typing import List, Optional, Dict, Any
+from typing import List, NamedTuple, Optional, Dict, Any
 from datetime import datetime
+from time import perf_counter_ns
+from django.conf import settings
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 import logging
 
-from apps.AI.models import AIModel, Prompt
+from apps.AI.models import AIModel, AIModelProvider, Prompt
+from apps.AI.services.batching import MicroBatcher
+from apps.AI.services.model_cache import aget_active_model
+from .utils import count_words
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -46,16 +52,55 @@ class PromptResponse(Schema):
     variables: List[str]
 
 
+class _BatchItem(NamedTuple):
+    model_name: str
+    prompt: str
+    conversation: Optional[str] = None
+
+
+async def _infer_batch(items: List[_BatchItem]) -> List[str]:
+    """Run one batched inference call for all queued prompts"""
+    # For now, return mock responses
+    # In production, this would send the whole batch to the model backend
+    return [
+        f"Based on our conversation, I understand you're asking about '{item.prompt}'. Here's my response from {item.model_name}."  # noqa: E501
+        if item.conversation is not None
+        else f"AI response from {item.model_name} to: {item.prompt}"
+        for item in items
+    ]
+
+
+inference_batcher = MicroBatcher(
+    _infer_batch,
+    max_batch_size=settings.AI_MAX_BATCH_SIZE,
+    max_wait_ms=settings.AI_BATCH_WINDOW_MS,
+)
+
+
+def _provider_name(model: AIModel) -> str:
+    """Name of the first provider, read from the prefetched ``providers``"""
+    provider = next(iter(model.providers.all()), None)
+    return provider.name if provider else "unknown"
+
+
 @router.get("/models/", response=List[AIModelResponse], tags=["Models"])
 def list_ai_models(request):
     """List all available AI models"""
     try:
-        models = AIModel.objects.filter(is_active=True).select_related("provider")
+        models = (
+            AIModel.objects.filter(is_active=True)
+            .only("id", "name", "model_type", "is_active", "parameters", "created_at")
+            .prefetch_related(
+                Prefetch(
+                    "providers", queryset=AIModelProvider.objects.only("id", "name")
+                )
+            )
+        )
         return [
             {
                 "id": model.id,
                 "name": model.name,
-                "provider": model.provider.name,
+                "provider": _provider_name(model),
                 "model_type": model.model_type,
                 "is_active": model.is_active,
                 "parameters": model.parameters,
@@ -64,7 +109,7 @@ def list_ai_models(request):
             for model in models
         ]
     except Exception as e:
-        logger.error(f"Failed to list AI models: {e}")
+        logger.error("Failed to list AI models: %s", e)
         return {"error": "Failed to fetch models"}, 500
 
 
@@ -72,46 +117,46 @@ def list_ai_models(request):
 def get_ai_model(request, model_id: int):
     """Get details of a specific AI model"""
     try:
-        model = get_object_or_404(AIModel, id=model_id)
+        model = get_object_or_404(
+            AIModel.objects.prefetch_related("providers"), id=model_id
+        )
         return {
             "id": model.id,
             "name": model.name,
-            "provider": model.provider.name,
+            "provider": _provider_name(model),
             "model_type": model.model_type,
             "is_active": model.is_active,
             "parameters": model.parameters,
             "created_at": model.created_at,
         }
     except Exception as e:
-        logger.error(f"Failed to get AI model: {e}")
+        logger.error("Failed to get AI model: %s", e)
         return {"error": "Model not found"}, 404
 
 
 @router.post("/inference/", response=InferenceResponse, tags=["Inference"])
-def run_inference(request, data: InferenceRequest):
+async def run_inference(request, data: InferenceRequest):
     """Run AI inference with the specified model"""
     try:
-        import time
-
-        start_time = time.time()
+        start_time = perf_counter_ns()
 
-        model = get_object_or_404(AIModel, id=data.model_id, is_active=True)
+        model = await aget_active_model(data.model_id)
 
-        # For now, return a mock response
-        # In production, this would integrate with actual AI models
-        mock_response = f"AI response from {model.name} to: {data.prompt}"
+        mock_response = await inference_batcher.submit(
+            _BatchItem(model.name, data.prompt)
+        )
 
-        processing_time = (time.time() - start_time) * 1000
+        processing_time = (perf_counter_ns() - start_time) / 1e6
 
         return {
             "response": mock_response,
             "model_used": model.name,
             "processing_time_ms": processing_time,
-            "tokens_used": len(data.prompt.split()) + len(mock_response.split()),
+            "tokens_used": count_words(data.prompt) + count_words(mock_response),
         }
 
     except Exception as e:
-        logger.error(f"Failed to run inference: {e}")
+        logger.error("Failed to run inference: %s", e)
         return {"error": "Inference failed"}, 500
 
 
@@ -137,7 +182,7 @@ def list_prompts(request, category: Optional[str] = None):
             for prompt in prompts
         ]
     except Exception as e:
-        logger.error(f"Failed to list prompts: {e}")
+        logger.error("Failed to list prompts: %s", e)
         return {"error": "Failed to fetch prompts"}, 500
 
 
@@ -154,41 +199,39 @@ def get_prompt(request, prompt_id: int):
             "variables": prompt.variables or [],
         }
     except Exception as e:
-        logger.error(f"Failed to get prompt: {e}")
+        logger.error("Failed to get prompt: %s", e)
         return {"error": "Prompt not found"}, 404
 
 
 @router.post("/models/{model_id}/chat/", response=InferenceResponse, tags=["Chat"])
-def chat_with_model(request, model_id: int, data: InferenceRequest):
+async def chat_with_model(request, model_id: int, data: InferenceRequest):
     """Have a conversation with an AI model"""
     try:
-        import time
+        start_time = perf_counter_ns()
 
-        start_time = time.time()
-
-        model = get_object_or_404(AIModel, id=model_id, is_active=True)
+        model = await aget_active_model(model_id)
 
         # Build conversation context
-        conversation_text = ""
-        for msg in data.context:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            conversation_text += f"{role}: {content}\n"
-
-        conversation_text += f"user: {data.prompt}\nassistant: "
+        parts = [
+            f"{msg.get('role', 'user')}: {msg.get('content', '')}\n"
+            for msg in data.context
+        ]
+        parts.append(f"user: {data.prompt}\nassistant: ")
+        conversation_text = "".join(parts)
 
-        # Mock AI response based on context
-        mock_response = f"Based on our conversation, I understand you're asking about '{data.prompt}'. Here's my response from {model.name}."  # noqa: E501
+        mock_response = await inference_batcher.submit(
+            _BatchItem(model.name, data.prompt, conversation_text)
+        )
 
-        processing_time = (time.time() - start_time) * 1000
+        processing_time = (perf_counter_ns() - start_time) / 1e6
 
         return {
             "response": mock_response,
             "model_used": model.name,
             "processing_time_ms": processing_time,
-            "tokens_used": len(conversation_text.split()) + len(mock_response.split()),
+            "tokens_used": count_words(conversation_text) + count_words(mock_response),
         }
 
     except Exception as e:
-        logger.error(f"Failed to chat with model: {e}")
+        logger.error("Failed to chat with model: %s", e)
         return {"error": "Chat failed"}, 500
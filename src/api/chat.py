@@ -1,10 +1,12 @@
 """
 Chat API endpoints for text messaging and conversation management
 """
-from ninja import Router, Schema
+from ninja import Field, Router, Schema
 from typing import List, Optional
 from datetime import datetime
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 import logging
 
@@ -21,6 +23,8 @@ router = Router()
 class MessageCreate(Schema):
     content: str
     conversation_id: Optional[str] = None
+    # Idempotency key: resending the same request_id returns the stored message
+    request_id: Optional[str] = Field(None, max_length=64)
 
 
 class MessageResponse(Schema):
@@ -55,18 +59,38 @@ class ChatUserResponse(Schema):
     settings: dict
 
 
-# Initialize sanitizer
+# Stateless, so shared across requests
 sanitizer = InputSanitizer()
 
 
+_default_chat_id: Optional[int] = None
+
+
+def _get_default_chat_id() -> int:
+    """Id of the chat owned by the API user, memoized after the first call"""
+    global _default_chat_id
+    if _default_chat_id is None:
+        user, created = User.objects.get_or_create(
+            username="api_user", defaults={"email": "api@example.com"}
+        )
+        chat, created = Chat.objects.get_or_create(user=user, defaults={})
+        _default_chat_id = chat.id
+    return _default_chat_id
+
+
 @router.post("/users/", response=ChatUserResponse, tags=["Users"])
 def create_chat_user(request, data: ChatUserCreate):
     """Create a new chat user"""
     try:
-        chat_user = ChatUser.objects.create(is_verified=False, settings=data.settings)
+        with transaction.atomic():
+            chat_user = ChatUser.objects.create(
+                is_verified=False, settings=data.settings
+            )
+            # Link the auth user now so WebSocket connects don't have to
+            chat_user.get_django_user_id()
         return chat_user
     except Exception as e:
-        logger.error(f"Failed to create chat user: {e}")
+        logger.error("Failed to create chat user: %s", e)
         return {"error": "Failed to create user"}, 500
 
 
@@ -77,48 +101,63 @@ def get_chat_user(request, user_id: int):
     return chat_user
 
 
-@router.post("/messages/", response=MessageResponse, tags=["Messages"])
-def send_message(request, data: MessageCreate):
-    """Send a chat message"""
-    try:
-        # Sanitize content
-        sanitized_content = sanitizer.sanitize_text(data.content)
-
-        # Get or create default user and chat
-        user, created = User.objects.get_or_create(
-            username="api_user", defaults={"email": "api@example.com"}
-        )
-
-        chat, created = Chat.objects.get_or_create(user=user, defaults={})
-
+def _create_message(data: MessageCreate, content: str) -> Message:
+    """Store a user message with its conversation and thread atomically"""
+    with transaction.atomic():
         # Get or create conversation
         if data.conversation_id:
-            conversation = get_object_or_404(Conversation, id=data.conversation_id)
+            conversation = (
+                Conversation.objects.filter(id=data.conversation_id)
+                .select_related(None)
+                .only("id")
+                .get()
+            )
         else:
-            conversation = Conversation.objects.create(chat=chat, is_active=True)
+            conversation = Conversation.objects.create(
+                chat_id=_get_default_chat_id(), is_active=True
+            )
 
         # Create thread for this message
         thread = Thread.objects.create(conversation=conversation)
 
         # Save message
-        message = Message.objects.create(
+        return Message.objects.create(
             conversation=conversation,
             thread=thread,
-            content=sanitized_content,
+            content=content,
             sender="user",
+            request_id=data.request_id,
         )
 
+
+@router.post("/messages/", response=MessageResponse, tags=["Messages"])
+def send_message(request, data: MessageCreate):
+    """Send a chat message"""
+    try:
+        # Sanitize content
+        sanitized_content = sanitizer.sanitize_text(data.content)
+
+        try:
+            message = _create_message(data, sanitized_content)
+        except IntegrityError:
+            if not data.request_id:
+                raise
+            # A retry of a request that was already stored
+            message = Message.objects.get(request_id=data.request_id)
+
         return {
             "id": message.id,
             "content": message.content,
             "sender": message.sender,
             "timestamp": message.created_at,
-            "conversation_id": conversation.id,
-            "thread_id": thread.id,
+            "conversation_id": message.conversation_id,
+            "thread_id": message.thread_id,
         }
 
+    except Conversation.DoesNotExist:
+        return {"error": "Conversation not found"}, 404
     except Exception as e:
-        logger.error(f"Failed to send message: {e}")
+        logger.error("Failed to send message: %s", e)
         return {"error": "Failed to send message"}, 500
 
 
@@ -128,8 +167,11 @@ def send_message(request, data: MessageCreate):
 def list_conversations(request):
     """List all active conversations"""
     try:
-        conversations = Conversation.objects.filter(is_active=True).prefetch_related(
-            "messages"
+        conversations = (
+            Conversation.objects.filter(is_active=True)
+            .select_related(None)
+            .annotate(message_count=Count("messages"))
+            .only("id", "created_at", "is_active", "is_archived")
         )
         return [
             {
@@ -137,12 +179,12 @@ def list_conversations(request):
                 "created_at": conv.created_at,
                 "is_active": conv.is_active,
                 "is_archived": conv.is_archived,
-                "message_count": conv.messages.count(),
+                "message_count": conv.message_count,
             }
             for conv in conversations
         ]
     except Exception as e:
-        logger.error(f"Failed to list conversations: {e}")
+        logger.error("Failed to list conversations: %s", e)
         return {"error": "Failed to fetch conversations"}, 500
 
 
@@ -154,8 +196,15 @@ def list_conversations(request):
 def get_conversation_messages(request, conversation_id: int, limit: int = 50):
     """Get messages for a specific conversation"""
     try:
-        conversation = get_object_or_404(Conversation, id=conversation_id)
-        messages = conversation.messages.order_by("-created_at")[:limit]
+        messages = list(
+            # Only scalar columns are read, so skip the manager's FK joins
+            Message.objects.filter(conversation_id=conversation_id)
+            .select_related(None)
+            .order_by("-created_at")
+            .only("id", "content", "sender", "created_at", "thread_id")[:limit]
+        )
+        # Latest N were fetched newest first; return them oldest first
+        messages.reverse()
 
         return [
             {
@@ -163,13 +212,13 @@ def get_conversation_messages(request, conversation_id: int, limit: int = 50):
                 "content": msg.content,
                 "sender": msg.sender,
                 "timestamp": msg.created_at,
-                "conversation_id": msg.conversation.id,
-                "thread_id": msg.thread.id if msg.thread else None,
+                "conversation_id": conversation_id,
+                "thread_id": msg.thread_id,
             }
-            for msg in reversed(messages)
+            for msg in messages
         ]
     except Exception as e:
-        logger.error(f"Failed to get conversation messages: {e}")
+        logger.error("Failed to get conversation messages: %s", e)
         return {"error": "Failed to fetch messages"}, 500
 
 
@@ -185,10 +234,10 @@ def generate_websocket_token(request, user_id: int):
         token_obj.instance = instance
         token_obj.save()
 
-        return {"token": token_obj.token, "expires_at": token_obj.created_at}
+        return {"token": token_obj.token, "expires_at": token_obj.expires_at}
 
     except Exception as e:
-        logger.error(f"Failed to generate WebSocket token: {e}")
+        logger.error("Failed to generate WebSocket token: %s", e)
         return {"error": "Failed to generate token"}, 500
 
 
@@ -204,5 +253,5 @@ def archive_conversation(request, conversation_id: int):
         return {"message": "Conversation archived successfully"}
 
     except Exception as e:
-        logger.error(f"Failed to archive conversation: {e}")
+        logger.error("Failed to archive conversation: %s", e)
         return {"error": "Failed to archive conversation"}, 500
@@ -65,12 +65,12 @@ def version_info(request):
 @api.exception_handler(ValidationError)
 def validation_exception_handler(request, exc):
     """Handle validation errors"""
-    logger.error(f"Validation error: {exc}")
+    logger.error("Validation error: %s", exc)
     return JsonResponse({"error": "Validation failed", "details": str(exc)}, status=400)
 
 
 @api.exception_handler(Exception)
 def global_exception_handler(request, exc):
     """Handle unexpected errors"""
-    logger.error(f"Unexpected error: {exc}", exc_info=True)
+    logger.error("Unexpected error: %s", exc, exc_info=True)
     return JsonResponse({"error": "Internal server error"}, status=500)
@@ -0,0 +1,8 @@
+"""
+Shared helpers for API endpoints
+"""
+
+
+def count_words(text: str) -> int:
+    """Count whitespace-separated words"""
+    return len(text.split())
@@ -1,5 +1,8 @@
 from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Max
 from .models import Prompt, PromptCategory, AIModel, AIModelProvider
+from .services.prompt_cache import invalidate_active_prompt
 
 
 @admin.register(Prompt)
@@ -11,32 +14,45 @@ class PromptAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     actions = ["activate_prompt", "deactivate_prompt"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ai_model")
+
     def activate_prompt(self, request, queryset):
-        for prompt in queryset:
-            # Deactivate other prompts of the same type
-            Prompt.objects.filter(type=prompt.type, is_active=True).exclude(
-                pk=prompt.pk
-            ).update(is_active=False)
-            # Activate this prompt
-            prompt.is_active = True
-            prompt.save()
-
-        if queryset.count() == 1:
+        # Only one prompt per type may be active, so when several of a type are
+        # selected the newest (highest pk) wins
+        active_pks = list(
+            queryset.order_by()
+            .values("type")
+            .annotate(newest=Max("pk"))
+            .values_list("newest", flat=True)
+        )
+        with transaction.atomic():
+            # Deactivate other prompts of the same types
+            Prompt.objects.filter(
+                type__in=queryset.values("type"), is_active=True
+            ).exclude(pk__in=active_pks).update(is_active=False)
+            # Activate the chosen prompts
+            count = Prompt.objects.filter(pk__in=active_pks).update(is_active=True)
+        # Bulk updates bypass the Prompt save signals
+        invalidate_active_prompt()
+
+        if count == 1:
             message = "1 prompt was activated."
         else:
-            message = f"{queryset.count()} prompts were activated."
+            message = f"{count} prompts were activated."
 
         self.message_user(request, message, messages.SUCCESS)
 
     activate_prompt.short_description = "Activate selected prompts"
 
     def deactivate_prompt(self, request, queryset):
-        queryset.update(is_active=False)
+        count = queryset.update(is_active=False)
+        invalidate_active_prompt()
 
-        if queryset.count() == 1:
+        if count == 1:
             message = "1 prompt was deactivated."
         else:
-            message = f"{queryset.count()} prompts were deactivated."
+            message = f"{count} prompts were deactivated."
 
         self.message_user(request, message, messages.SUCCESS)
 
@@ -58,6 +74,9 @@ class AIModelAdmin(admin.ModelAdmin):
 
     actions = ["get_prompts"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("prompts")
+
     def get_prompts(self, obj):
         return ", ".join([p.name for p in obj.prompts.all()])
 
@@ -72,6 +91,9 @@ class AIModelProviderAdmin(admin.ModelAdmin):
 
     actions = ["get_models"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("models")
+
     def get_models(self, obj):
         return ", ".join([m.name for m in obj.models.all()])
 
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-15 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("AI", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aimodel",
+            name="is_active",
+            field=models.BooleanField(
+                default=True,
+                help_text="Indicates if the model is available for inference",
+            ),
+        ),
+        migrations.AddField(
+            model_name="aimodel",
+            name="model_type",
+            field=models.CharField(
+                default="text",
+                help_text="Kind of model, e.g. text, speech-to-text, text-to-speech",
+                max_length=50,
+            ),
+        ),
+        migrations.AddField(
+            model_name="aimodel",
+            name="parameters",
+            field=models.JSONField(
+                blank=True, default=dict, help_text="Default inference parameters"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-15 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("AI", "0002_aimodel_type_parameters_is_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prompt",
+            name="type",
+            field=models.CharField(
+                default="system",
+                help_text="Prompt type; only one prompt per type is active at a time",
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-15 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("AI", "0003_prompt_type"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="prompt",
+            index=models.Index(fields=["is_active"], name="prompt_is_acti_582f0f_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="prompt",
+            index=models.Index(
+                fields=["type", "is_active"], name="prompt_type_39b9f1_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prompt",
+            index=models.Index(
+                fields=["ai_model", "is_active"], name="prompt_ai_mode_e78090_idx"
+            ),
+        ),
+    ]
@@ -7,6 +7,12 @@ class Prompt(models.Model):
     response = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    type = models.CharField(
+        max_length=50,
+        default="system",
+        help_text="Prompt type; only one prompt per type is active at a time",
+    )
+
     is_active = models.BooleanField(
         default=True, help_text="Indicates if the prompt is active or not"
     )
@@ -28,6 +34,11 @@ class Prompt(models.Model):
         verbose_name = "Prompt"
         verbose_name_plural = "Prompts"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["is_active"]),
+            models.Index(fields=["type", "is_active"]),
+            models.Index(fields=["ai_model", "is_active"]),
+        ]
 
 
 class PromptCategory(models.Model):
@@ -82,6 +93,20 @@ class AIModel(models.Model):
         null=True, blank=True, help_text="Maximum response length for the model"
     )
 
+    model_type = models.CharField(
+        max_length=50,
+        default="text",
+        help_text="Kind of model, e.g. text, speech-to-text, text-to-speech",
+    )
+
+    parameters = models.JSONField(
+        default=dict, blank=True, help_text="Default inference parameters"
+    )
+
+    is_active = models.BooleanField(
+        default=True, help_text="Indicates if the model is available for inference"
+    )
+
     def __str__(self):
         return self.name
 
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects requests that arrive within a short window and dispatches
+    them to the backend as a single batch, fanning the results back out
+    to the individual callers.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+    ):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        # Event loop -> (queue, batch processor task)
+        self._workers: Dict[
+            asyncio.AbstractEventLoop, Tuple[asyncio.Queue, asyncio.Task]
+        ] = {}
+
+    def _ensure_started(self) -> asyncio.Queue:
+        """Return the running loop's queue, starting its processor if needed"""
+        loop = asyncio.get_running_loop()
+        # Under WSGI each async view gets its own short-lived loop, possibly
+        # on another thread, so every loop has its own queue and processor.
+        entry = self._workers.get(loop)
+        if entry is None or entry[1].done():
+            for other in list(self._workers):
+                if other.is_closed():
+                    self._workers.pop(other, None)
+            queue = asyncio.Queue()
+            entry = (queue, loop.create_task(self._batch_processor(queue)))
+            self._workers[loop] = entry
+        return entry[0]
+
+    async def submit(self, payload: Any) -> Any:
+        """Queue a single payload and wait for its batched result"""
+        queue = self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((payload, future))
+        return await future
+
+    async def _batch_processor(self, queue: asyncio.Queue):
+        """Drain the queue in batches of up to max_batch_size"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait_seconds
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            payloads = [item[0] for item in batch]
+            futures = [item[1] for item in batch]
+
+            try:
+                results = await self.handler(payloads)
+                if len(results) != len(futures):
+                    raise ValueError(
+                        f"Batch handler returned {len(results)} results "
+                        f"for {len(futures)} requests"
+                    )
+                for future, result in zip(futures, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                logger.exception("Error in batch processor")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
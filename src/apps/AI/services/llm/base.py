@@ -1,5 +1,6 @@
 import logging
-from ..models import Prompt
+from ...models import Prompt
+from ..prompt_cache import get_active_prompt
 
 
 class BaseAIService:
@@ -61,9 +62,7 @@ class BaseAIService:
         by subclasses to get the active prompt.
         """
         try:
-            # Assuming there's a Prompt model with an is_active field
-            prompt = Prompt.objects.get(is_active=True)
-            return prompt.prompt
+            return get_active_prompt()
         except Prompt.DoesNotExist:
             self.logger.error("No active prompt found.")
             return None
@@ -76,4 +75,3 @@ class BaseAIService:
         Log a message using the logger.
         """
         self.logger.info(message)
-        self.log(message)
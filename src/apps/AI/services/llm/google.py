@@ -1,4 +1,3 @@
-from google import genai
 from .base import BaseAIService
 
 
@@ -10,6 +9,10 @@ class BaseGoogleService(BaseAIService):
     """
 
     def __init__(self):
+        # Imported here so workers that never use Google services skip
+        # loading the SDK at startup
+        from google import genai
+
         super(BaseGoogleService, self).__init__()
         self.api_key = None  # TODO get from db
         self.client = genai.Client(api_key=self.api_key)
@@ -0,0 +1,35 @@
+import time
+from typing import Dict, Tuple
+
+from django.http import Http404
+
+from ..models import AIModel
+
+# Active models rarely change, so inference endpoints read them from an
+# in-process cache. Entries are dropped by the AIModel save/delete signals;
+# the TTL bounds staleness for changes made by other processes.
+MODEL_CACHE_TTL_SECONDS = 60.0
+
+_MODEL_CACHE: Dict[int, Tuple[AIModel, float]] = {}
+
+
+async def aget_active_model(model_id: int) -> AIModel:
+    """Get an active AI model by id, raising Http404 if there is none"""
+    entry = _MODEL_CACHE.get(model_id)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+
+    try:
+        model = await AIModel.objects.only("id", "name", "is_active").aget(
+            id=model_id, is_active=True
+        )
+    except AIModel.DoesNotExist:
+        raise Http404("No active AIModel matches the given query.")
+
+    _MODEL_CACHE[model_id] = (model, time.monotonic() + MODEL_CACHE_TTL_SECONDS)
+    return model
+
+
+def invalidate_model(model_id: int):
+    """Drop a model from the cache"""
+    _MODEL_CACHE.pop(model_id, None)
@@ -0,0 +1,29 @@
+import time
+from typing import Optional, Tuple
+
+from ..models import Prompt
+
+# The active prompt is read on every AI call but changes rarely, so it is
+# kept in-process. Prompt signals and the admin bulk actions invalidate it;
+# the TTL bounds staleness for changes made by other processes.
+PROMPT_CACHE_TTL_SECONDS = 60.0
+
+_active_prompt: Optional[Tuple[str, float]] = None
+
+
+def get_active_prompt() -> str:
+    """Get the active prompt text, raising Prompt.DoesNotExist if there is none"""
+    global _active_prompt
+    entry = _active_prompt
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+
+    text = Prompt.objects.values_list("prompt", flat=True).get(is_active=True)
+    _active_prompt = (text, time.monotonic() + PROMPT_CACHE_TTL_SECONDS)
+    return text
+
+
+def invalidate_active_prompt():
+    """Drop the cached active prompt"""
+    global _active_prompt
+    _active_prompt = None
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AIModel, Prompt
+from .services.model_cache import invalidate_model
+from .services.prompt_cache import invalidate_active_prompt
+
+
+@receiver([post_save, post_delete], sender=AIModel)
+def invalidate_model_cache(sender, instance, **kwargs):
+    invalidate_model(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Prompt)
+def invalidate_prompt_cache(sender, instance, **kwargs):
+    invalidate_active_prompt()
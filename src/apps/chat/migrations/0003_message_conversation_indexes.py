@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-15 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("AI", "0004_prompt_indexes"),
+        ("chat", "0002_chatuser"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["is_active"], name="chat_conver_is_acti_72f866_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "-created_at"],
+                name="chat_messag_convers_d0740f_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-15 20:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("AI", "0004_prompt_indexes"),
+        ("chat", "0003_message_conversation_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chat",
+            index=models.Index(
+                fields=["-created_at"], name="chat_chat_created_fa771b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["-created_at"], name="chat_conver_created_766071_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["chat", "is_active"], name="chat_conver_chat_id_1c2293_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["-created_at"], name="chat_messag_created_f18bb8_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="thread",
+            index=models.Index(
+                fields=["-created_at"], name="chat_thread_created_40e446_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-15 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0004_chat_model_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="request_id",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
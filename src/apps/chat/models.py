@@ -1,7 +1,23 @@
+from django.contrib.auth.models import User
 from django.db import models
 from apps.AI.models import AIModel
 
 
+class MessageManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().select_related("conversation", "thread")
+
+
+class ConversationManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().select_related("chat", "ai_model")
+
+
+class ThreadManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().select_related("conversation")
+
+
 class ChatUser(models.Model):
     """
     Model representing a user in a chat session.
@@ -9,6 +25,24 @@ class ChatUser(models.Model):
 
     is_verified = models.BooleanField(default=False)
     settings = models.JSONField(default=dict)
+    # Auth user owning this chat user's chats, set when the chat user is created
+    django_user = models.OneToOneField(
+        "auth.User",
+        null=True,
+        blank=True,
+        related_name="chat_user",
+        on_delete=models.SET_NULL,
+    )
+
+    def get_django_user_id(self) -> int:
+        """Id of the linked auth user, created and linked on first use"""
+        if self.django_user_id is None:
+            username = f"chat_user_{self.pk}"
+            self.django_user, created = User.objects.get_or_create(
+                username=username, defaults={"email": f"{username}@example.com"}
+            )
+            self.save(update_fields=["django_user"])
+        return self.django_user_id
 
     class Meta:
         verbose_name = "Chat User"
@@ -34,6 +68,7 @@ class Chat(models.Model):
         verbose_name = "Chat"
         verbose_name_plural = "Chats"
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["-created_at"])]
 
 
 class Message(models.Model):
@@ -63,15 +98,23 @@ class Message(models.Model):
     )
     content = models.TextField()
     sender = models.CharField(max_length=50, choices=SENDER_CHOICES)
+    # Client-supplied idempotency key; the unique index rejects retried inserts
+    request_id = models.CharField(max_length=64, null=True, blank=True, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = MessageManager()
+
     def __str__(self):
-        return f"Message {self.pk} in Thread {self.thread.pk}"
+        return f"Message {self.pk} in Thread {self.thread_id}"
 
     class Meta:
         verbose_name = "Message"
         verbose_name_plural = "Messages"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"]),
+            models.Index(fields=["conversation", "-created_at"]),
+        ]
 
 
 class Conversation(models.Model):
@@ -95,6 +138,8 @@ class Conversation(models.Model):
     is_active = models.BooleanField(default=True)
     is_archived = models.BooleanField(default=False)
 
+    objects = ConversationManager()
+
     def __str__(self):
         return f"Conversation {self.pk} in Chat {self.chat.pk}"
 
@@ -102,6 +147,11 @@ class Conversation(models.Model):
         verbose_name = "Conversation"
         verbose_name_plural = "Conversations"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"]),
+            models.Index(fields=["is_active"]),
+            models.Index(fields=["chat", "is_active"]),
+        ]
 
 
 class Thread(models.Model):
@@ -118,6 +168,8 @@ class Thread(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ThreadManager()
+
     def __str__(self):
         return f"Thread {self.pk} in Conversation {self.conversation.pk}"
 
@@ -125,3 +177,4 @@ class Thread(models.Model):
         verbose_name = "Thread"
         verbose_name_plural = "Threads"
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["-created_at"])]
@@ -1,13 +1,19 @@
 import asyncio
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
+from pydantic_core import to_json
 import httpx  # Changed from aiohttp
+import hashlib
 import json
 import logging
-from datetime import datetime
+import random
+import time
+import cachetools
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {"content-type": "application/json"}
+
 
 class MLRequest(BaseModel):
     context: List[Dict[str, Any]]
@@ -38,53 +44,80 @@ class MLPipeline:
         max_retries: int = 3,
         timeout_seconds: float = 15.0,
         batch_enabled: bool = False,
+        max_batch_size: int = 16,
+        batch_window_ms: float = 5.0,
     ):
         self.model_endpoint = model_endpoint
         self.cache_enabled = cache_enabled
         self.cache_ttl_seconds = cache_ttl_seconds
-        self.cache = {}  # Simple in-memory cache
+        self.cache = cachetools.TTLCache(maxsize=1000, ttl=cache_ttl_seconds)
         self.max_retries = max_retries
         self.timeout_seconds = timeout_seconds
         self.batch_enabled = batch_enabled
+        self.max_batch_size = max_batch_size
+        self.batch_window_seconds = batch_window_ms / 1000
         self.batch_queue = asyncio.Queue()
         self.batch_task = None
+        self._client: Optional[httpx.AsyncClient] = None
 
     async def initialize(self):
         """Initialize the ML pipeline including batch processor if enabled"""
+        self._client = self._create_client()
         if self.batch_enabled:
             self.batch_task = asyncio.create_task(self._batch_processor())
 
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client shared by all ML service calls"""
+        return httpx.AsyncClient(
+            timeout=self.timeout_seconds,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    async def aclose(self):
+        """Stop the batch processor and close pooled connections"""
+        if self.batch_task:
+            self.batch_task.cancel()
+            self.batch_task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
     async def _batch_processor(self):
         """Process batches of ML requests for more efficient inference"""
+        loop = asyncio.get_running_loop()
         while True:
             try:
-                # Collect requests for batch processing
-                batch = []
-                # Get the first item with a timeout
-                try:
-                    first_item = await asyncio.wait_for(
-                        self.batch_queue.get(),
-                        timeout=0.1,  # 100ms timeout to wait for first item
-                    )
-                    batch.append(first_item)
+                # Block until the first request arrives; no idle polling
+                batch = [await self.batch_queue.get()]
+                self.batch_queue.task_done()
+
+                # Give concurrent requests a short window to join the batch
+                deadline = loop.time() + self.batch_window_seconds
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.batch_queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    batch.append(item)
                     self.batch_queue.task_done()
-                except asyncio.TimeoutError:
-                    # No items in queue, continue loop
-                    await asyncio.sleep(0.01)
-                    continue
-
-                # Try to get more items without blocking
-                max_batch_size = 16  # Prevent too large batches
-                while len(batch) < max_batch_size:
+
+                # Take anything else already queued without waiting
+                while len(batch) < self.max_batch_size:
                     try:
                         item = self.batch_queue.get_nowait()
-                        batch.append(item)
-                        self.batch_queue.task_done()
                     except asyncio.QueueEmpty:
                         break
-
-                if not batch:
-                    continue
+                    batch.append(item)
+                    self.batch_queue.task_done()
 
                 # Process the batch
                 batch_requests = [item[0] for item in batch]  # Extract requests
@@ -113,7 +146,7 @@ class MLPipeline:
 
     async def process_request(self, ml_request: MLRequest) -> MLResponse:
         """Process an ML request, optionally using cache"""
-        start_time = asyncio.get_event_loop().time()
+        start_time = time.monotonic()
 
         # Check cache if enabled
         if self.cache_enabled:
@@ -122,11 +155,8 @@ class MLPipeline:
             if cached_response:
                 return cached_response
 
-        # Prepare for retries
-        retries_left = self.max_retries
         last_error = None
-
-        while retries_left > 0:
+        for attempt in range(self.max_retries):
             try:
                 if self.batch_enabled:
                     # Use batch processing
@@ -137,34 +167,39 @@ class MLPipeline:
                     response = await asyncio.wait_for(
                         future, timeout=self.timeout_seconds
                     )
-                    break
                 else:
                     # Direct request
                     response = await self._send_request(ml_request)
-                    break
+                break
             except asyncio.TimeoutError:
                 last_error = "Request timed out"
-                retries_left -= 1
-            except Exception as e:
+            except httpx.HTTPStatusError as e:
+                # Only server-side failures are worth retrying
+                if not 500 <= e.response.status_code < 600:
+                    raise
+                last_error = str(e)
+            except httpx.TransportError as e:
+                # Connection errors and httpx timeouts
                 last_error = str(e)
-                retries_left -= 1
-
-            if retries_left > 0:
-                # Exponential backoff
-                await asyncio.sleep(0.1 * (2 ** (self.max_retries - retries_left)))
 
-        if retries_left == 0 and last_error:
+            if attempt + 1 < self.max_retries:
+                # Jittered exponential backoff so concurrent callers
+                # don't retry in lockstep
+                await asyncio.sleep(random.uniform(0, 0.05 * 2**attempt))
+        else:
             logger.error(
                 f"ML request failed after {self.max_retries} retries: {last_error}"
             )
             raise Exception(f"Failed to process ML request: {last_error}")
 
         # Calculate processing time
-        end_time = asyncio.get_event_loop().time()
+        end_time = time.monotonic()
         processing_time = end_time - start_time
 
         # Add processing time and timestamp to response
-        response_dict = response.dict() if hasattr(response, "dict") else response
+        response_dict = (
+            response.model_dump() if isinstance(response, BaseModel) else response
+        )
         response_dict["processing_time"] = processing_time
         response_dict["timestamp"] = end_time
 
@@ -178,81 +213,70 @@ class MLPipeline:
 
     async def _send_request(self, ml_request: MLRequest) -> Dict:
         """Send a single request to the ML service"""
-        payload = ml_request.dict()
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.model_endpoint, json=payload, timeout=self.timeout_seconds
+        # Serialize straight to bytes in pydantic's Rust encoder instead of
+        # building a dict for httpx's stdlib json path
+        response = await self.client.post(
+            self.model_endpoint,
+            content=ml_request.model_dump_json(),
+            headers=_JSON_HEADERS,
+        )
+
+        if response.status_code == 200:  # Changed from response.status
+            return response.json()  # Changed from await response.json()
+        else:
+            error_text = response.text  # Changed from await response.text()
+            logger.error(f"ML service error: {response.status_code}, {error_text}")
+            raise httpx.HTTPStatusError(
+                f"ML service error: {response.status_code}",
+                request=response.request,
+                response=response,
             )
 
-            if response.status_code == 200:  # Changed from response.status
-                return response.json()  # Changed from await response.json()
-            else:
-                error_text = response.text  # Changed from await response.text()
-                logger.error(f"ML service error: {response.status_code}, {error_text}")
-                raise Exception(f"ML service error: {response.status_code}")
-
     async def _send_batch_request(self, requests: List[MLRequest]) -> List[Dict]:
         """Send a batch request to the ML service"""
-        # Convert all requests to dicts
-        payload = {"batch": [request.dict() for request in requests]}
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.model_endpoint}/batch",
-                json=payload,
-                timeout=self.timeout_seconds * 2,  # Longer timeout for batches
+        response = await self.client.post(
+            f"{self.model_endpoint}/batch",
+            content=to_json({"batch": requests}),
+            headers=_JSON_HEADERS,
+            timeout=self.timeout_seconds * 2,  # Longer timeout for batches
+        )
+
+        if response.status_code == 200:  # Changed from response.status
+            return response.json()  # Changed from await response.json()
+        else:
+            error_text = response.text  # Changed from await response.text()
+            logger.error(
+                f"ML batch service error: {response.status_code}, {error_text}"
+            )
+            raise httpx.HTTPStatusError(
+                f"ML batch service error: {response.status_code}",
+                request=response.request,
+                response=response,
             )
 
-            if response.status_code == 200:  # Changed from response.status
-                return response.json()  # Changed from await response.json()
-            else:
-                error_text = response.text  # Changed from await response.text()
-                logger.error(
-                    f"ML batch service error: {response.status_code}, {error_text}"
-                )
-                raise Exception(f"ML batch service error: {response.status_code}")
-
-    def _generate_cache_key(self, ml_request: MLRequest) -> str:
-        """Generate a unique cache key for the request"""
-        # Use deterministic parts of the request for the cache key
-        key_parts = [
-            ml_request.model_name,
-            json.dumps(ml_request.context),
-            json.dumps(ml_request.parameters),
-        ]
-        return ":".join(key_parts)
-
-    def _get_from_cache(self, cache_key: str) -> Optional[MLResponse]:
+    def _generate_cache_key(self, ml_request: MLRequest) -> bytes:
+        """Generate a fixed-size cache key for the request"""
+        # Hash the deterministic parts of the request so keys stay 16 bytes
+        # no matter how long the conversation context grows
+        h = hashlib.blake2b(digest_size=16)
+        h.update(ml_request.model_name.encode())
+        h.update(b"\0")
+        for item in ml_request.context:
+            h.update(to_json(item))
+        h.update(b"\0")
+        h.update(
+            json.dumps(
+                ml_request.parameters, sort_keys=True, separators=(",", ":")
+            ).encode()
+        )
+        return h.digest()
+
+    def _get_from_cache(self, cache_key: bytes) -> Optional[MLResponse]:
         """Try to get a response from cache"""
-        if cache_key in self.cache:
-            entry = self.cache[cache_key]
-            # Check if entry is still valid
-            if (
-                datetime.utcnow().timestamp() - entry["timestamp"]
-            ) < self.cache_ttl_seconds:
-                return entry["response"]
-            else:
-                # Remove expired entry
-                del self.cache[cache_key]
-        return None
-
-    def _add_to_cache(self, cache_key: str, response: MLResponse):
+        # TTLCache drops expired entries on access
+        return self.cache.get(cache_key)
+
+    def _add_to_cache(self, cache_key: bytes, response: MLResponse):
         """Add a response to the cache"""
-        self.cache[cache_key] = {
-            "response": response,
-            "timestamp": datetime.utcnow().timestamp(),
-        }
-
-        # Simple cache cleanup - remove oldest entries if too many
-        if len(self.cache) > 1000:  # Arbitrary limit
-            # Remove entries that are older than 20% of TTL
-            current_time = datetime.utcnow().timestamp()
-            to_remove = []
-            for key, entry in self.cache.items():
-                if (current_time - entry["timestamp"]) > (self.cache_ttl_seconds * 0.8):
-                    to_remove.append(key)
-
-            # Remove identified entries
-            for key in to_remove:
-                del self.cache[key]
+        # TTLCache evicts expired, then least recently used, entries when full
+        self.cache[cache_key] = response
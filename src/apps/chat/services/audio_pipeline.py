@@ -1,10 +1,17 @@
 import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from pydantic import BaseModel
 import structlog
 
 logger = structlog.getLogger(__name__)
 
+# Shared by all AudioProcessor instances for CPU-bound chunk processing
+_dsp_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="dsp")
+
 
 class AudioChunk(BaseModel):
     data: bytes
@@ -16,49 +23,78 @@ class AudioChunk(BaseModel):
 
 
 class AudioProcessor:
-    def __init__(self, chunk_size_ms=20, sample_rate=16000):
+    def __init__(
+        self, chunk_size_ms=20, sample_rate=16000, queue_size=32, idle_timeout=60.0
+    ):
         self.chunk_size_ms = chunk_size_ms
         self.sample_rate = sample_rate
         self.vad_threshold = 0.3  # Voice Activity Detection threshold
+        # Mean magnitude a chunk must exceed to count as speech
+        self._vad_level = self.vad_threshold * 32767
+        self.queue_size = queue_size
+        # Seconds without a chunk after which a session's worker exits
+        self.idle_timeout = idle_timeout
+        # session_id -> (chunk queue, worker task)
         self._processing_tasks = {}
 
     async def process_stream(self, audio_stream, session_id, user_id):
         """Process incoming audio stream in real-time"""
-
         async for chunk in audio_stream:
-            # Create a task for each chunk to process concurrently
-            task = asyncio.create_task(
-                self._process_chunk(
-                    AudioChunk(
-                        data=chunk,
-                        sample_rate=self.sample_rate,
-                        user_id=user_id,
-                        timestamp=asyncio.get_event_loop().time(),
-                        session_id=session_id,
-                    )
+            # Looked up per chunk, as the worker exits when the stream goes idle.
+            # put blocks when the worker falls behind, back-pressuring the producer
+            await self._get_session_queue(session_id).put(
+                AudioChunk(
+                    data=chunk,
+                    sample_rate=self.sample_rate,
+                    user_id=user_id,
+                    timestamp=time.monotonic(),
+                    session_id=session_id,
                 )
             )
-            self._processing_tasks[session_id] = task
+
+    def _get_session_queue(self, session_id) -> asyncio.Queue:
+        """Return the session's chunk queue, starting its worker if needed"""
+        entry = self._processing_tasks.get(session_id)
+        if entry is None or entry[1].done():
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            worker = asyncio.create_task(self._chunk_worker(queue))
+            entry = (queue, worker)
+            self._processing_tasks[session_id] = entry
+            # Workers exit when idle and then remove their entry, so abandoned
+            # sessions don't linger
+            worker.add_done_callback(lambda t, s=session_id: self._discard_worker(s, t))
+        return entry[0]
+
+    def _discard_worker(self, session_id, worker):
+        """Drop a session entry if it still belongs to the given worker"""
+        entry = self._processing_tasks.get(session_id)
+        if entry is not None and entry[1] is worker:
+            del self._processing_tasks[session_id]
+
+    async def _chunk_worker(self, queue: asyncio.Queue):
+        """Process a session's chunks one at a time, in arrival order"""
+        while True:
+            try:
+                chunk = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    return
+                continue
+            try:
+                await self._process_chunk(chunk)
+            finally:
+                queue.task_done()
 
     async def _process_chunk(self, chunk: AudioChunk):
         """Process a single audio chunk with various enhancement techniques"""
         try:
-            # Convert bytes to numpy array
-            audio_data = np.frombuffer(chunk.data, dtype=np.int16)
-
-            # Apply noise reduction
-            processed_data = await self._reduce_noise(audio_data)
-
-            # Apply automatic gain control
-            processed_data = await self._apply_gain_control(processed_data)
-
-            # Check voice activity
-            is_speech = await self._detect_voice_activity(processed_data)
-
-            if is_speech:
-                # Pack back into bytes
-                processed_bytes = processed_data.astype(np.int16).tobytes()
+            # Run the NumPy work on the shared pool; it releases the GIL, so
+            # the event loop keeps serving I/O meanwhile
+            processed_bytes = await asyncio.get_running_loop().run_in_executor(
+                _dsp_pool, self._dsp_pipeline, chunk.data
+            )
 
+            if processed_bytes is not None:
                 # Return enhanced audio
                 return AudioChunk(
                     data=processed_bytes,
@@ -73,31 +109,59 @@ class AudioProcessor:
             logger.error(f"Error processing audio chunk: {str(e)}")
             return None
 
-    async def _reduce_noise(self, audio_data):
+    def _dsp_pipeline(self, data: bytes):
+        """Noise reduction, AGC and VAD in one pass; None if no speech"""
+        # Copy into a writable buffer so gain can be applied in place
+        audio_data = np.frombuffer(bytearray(data), dtype=np.int16)
+
+        # Apply noise reduction
+        audio_data = self._reduce_noise(audio_data)
+
+        # One int32 abs buffer serves both AGC and VAD; int32 avoids the
+        # int16 overflow on abs(-32768)
+        magnitude = np.abs(audio_data, dtype=np.int32)
+
+        # Apply automatic gain control
+        gain = self._apply_gain_control(audio_data, magnitude)
+
+        # Check voice activity on the gain-adjusted signal
+        if self._detect_voice_activity(magnitude, gain):
+            return audio_data.tobytes()
+        return None
+
+    def _reduce_noise(self, audio_data):
         """Apply noise reduction algorithm"""
         # Placeholder for actual noise reduction implementation
         # In production, use a proper noise reduction library
         return audio_data
 
-    async def _apply_gain_control(self, audio_data):
-        """Apply automatic gain control to normalize volume"""
+    def _apply_gain_control(self, audio_data, magnitude):
+        """Apply automatic gain control in place and return the gain used"""
         # Simple normalization example (actual AGC would be more complex)
         if audio_data.size > 0:
-            max_amplitude = np.max(np.abs(audio_data))
-            if max_amplitude > 0:
-                gain_factor = 0.7 * 32767 / max_amplitude  # Target 70% of max amplitude
-                return audio_data * min(gain_factor, 2.0)  # Limit max gain
-        return audio_data
-
-    async def _detect_voice_activity(self, audio_data):
+            peak = int(magnitude.max())
+            if peak > 0:
+                gain_factor = 0.7 * 32767 / peak  # Target 70% of max amplitude
+                gain = min(gain_factor, 2.0)  # Limit max gain
+                # The target keeps peak * gain within int16 range
+                np.multiply(audio_data, gain, out=audio_data, casting="unsafe")
+                return gain
+        return 1.0
+
+    def _detect_voice_activity(self, magnitude, gain=1.0):
         """Detect if audio chunk contains speech"""
-        if audio_data.size > 0:
-            energy = np.mean(np.abs(audio_data))
-            return energy > self.vad_threshold * 32767
+        if magnitude.size > 0:
+            energy = float(magnitude.mean()) * gain
+            return energy > self._vad_level
         return False
 
     async def terminate_session(self, session_id):
         """Clean up resources for a session"""
-        if session_id in self._processing_tasks:
-            self._processing_tasks[session_id].cancel()
-            del self._processing_tasks[session_id]
+        entry = self._processing_tasks.pop(session_id, None)
+        if entry is not None:
+            queue, worker = entry
+            worker.cancel()
+            # Drop any chunks the worker never got to
+            while not queue.empty():
+                queue.get_nowait()
+                queue.task_done()
@@ -1,8 +1,11 @@
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
 from typing import Any
-import aioredis
+import cachetools
 from pydantic import BaseModel
 import structlog
-from datetime import datetime
+from datetime import datetime, timezone
 
 logger = structlog.get_logger()
 
@@ -16,41 +19,39 @@ class Message(BaseModel):
     metadata: dict[str, Any] = {}
 
 
+@dataclass
+class _Ctx:
+    system: list[Message]
+    rolling: deque[Message]
+
+
 class ContextManager:
     def __init__(self, max_context_length: int = 20):
         self.max_context_length = max_context_length
-        self.session_contexts: dict[str, list[Message]] = {}
+        self.session_contexts: dict[str, _Ctx] = {}
 
     def add_message(self, message: Message):
-        if message.session_id not in self.session_contexts:
-            self.session_contexts[message.session_id] = []
-        self.session_contexts[message.session_id].append(message)
-        if len(self.session_contexts[message.session_id]) > self.max_context_length:
-            system_messages = [
-                msg
-                for msg in self.session_contexts[message.session_id]
-                if msg.role == "system"
-            ]
-
-            other_messages = [
-                msg
-                for msg in self.session_contexts[message.session_id]
-                if msg.role != "system"
-            ]
-
-            # Keep the N most recent non-system messages
-            retained_count = self.max_context_length - len(system_messages)
-            retained_messages = (
-                other_messages[-retained_count:] if retained_count > 0 else []
-            )
-
-            # Reconstruct context with system messages first, then recent messages
-            self.session_contexts[message.session_id] = (
-                system_messages + retained_messages
+        ctx = self.session_contexts.get(message.session_id)
+        if ctx is None:
+            ctx = self.session_contexts[message.session_id] = _Ctx(
+                [], deque(maxlen=self.max_context_length)
             )
+        # The bounded deque drops the oldest non-system message on overflow
+        (ctx.system if message.role == "system" else ctx.rolling).append(message)
 
     def get_context(self, session_id: str) -> list[Message]:
-        return self.session_contexts.get(session_id, [])
+        ctx = self.session_contexts.get(session_id)
+        if ctx is None:
+            return []
+        # System messages first, then the most recent messages that fit
+        retained_count = self.max_context_length - len(ctx.system)
+        if retained_count <= 0:
+            return list(ctx.system)
+        if retained_count >= len(ctx.rolling):
+            return ctx.system + list(ctx.rolling)
+        return ctx.system + list(
+            islice(ctx.rolling, len(ctx.rolling) - retained_count, None)
+        )
 
     def clear_session(self, session_id: str):
         if session_id in self.session_contexts:
@@ -65,11 +66,18 @@ class MessageOrchestrator:
         self.context_manager = ContextManager()
         self.redis_url = redis_url
         self.redis_client = None
-        self.active_sessions: dict[str, dict[str, Any]] = {}
+        # Sessions idle for an hour expire even without terminate_session
+        self.active_sessions: cachetools.TTLCache[
+            str, dict[str, Any]
+        ] = cachetools.TTLCache(maxsize=10_000, ttl=3600)
 
     async def initialize(self):
         if self.redis_url:
-            self.redis_client = await aioredis.create_redis_pool(self.redis_url)
+            # Only pay for the Redis client import when persistence is on
+            import redis.asyncio as redis
+
+            # from_url manages its own connection pool
+            self.redis_client = redis.Redis.from_url(self.redis_url)
             logger.info("Connected to Redis")
         else:
             logger.warning("No Redis URL provided, running in local mode")
@@ -83,24 +91,27 @@ class MessageOrchestrator:
 
         # Store in Redis if available for persistence
         if self.redis_client:
-            await self.redis_client.lpush(
-                f"session:{session_id}:messages", message.json()
-            )
+            key = f"session:{session_id}:messages"
+            pipe = self.redis_client.pipeline()
+            pipe.lpush(key, message.model_dump_json())
             # Trim the list to a reasonable size to prevent memory issues
-            await self.redis_client.ltrim(f"session:{session_id}:messages", 0, 99)
+            pipe.ltrim(key, 0, 99)
+            await pipe.execute()
 
         # Track active session
-        if session_id not in self.active_sessions:
+        now_iso = datetime.now(timezone.utc).isoformat()
+        session = self.active_sessions.get(session_id)
+        if session is None:
             self.active_sessions[session_id] = {
-                "created_at": datetime.utcnow().isoformat(),
-                "last_activity": datetime.utcnow().isoformat(),
+                "created_at": now_iso,
+                "last_activity": now_iso,
                 "message_count": 1,
             }
         else:
-            self.active_sessions[session_id][
-                "last_activity"
-            ] = datetime.utcnow().isoformat()
-            self.active_sessions[session_id]["message_count"] += 1
+            session["last_activity"] = now_iso
+            session["message_count"] += 1
+            # Reassign to restart the idle timer
+            self.active_sessions[session_id] = session
 
         return self.context_manager.get_context(session_id)
 
@@ -142,8 +153,8 @@ class MessageOrchestrator:
             if messages:
                 archive_key = f"archive:session:{session_id}:messages"
                 pipe = self.redis_client.pipeline()
-                for msg in messages:
-                    pipe.rpush(archive_key, msg)
+                # RPUSH is variadic: one command for the whole history
+                pipe.rpush(archive_key, *messages)
                 pipe.delete(f"session:{session_id}:messages")
                 pipe.expire(archive_key, 60 * 60 * 24 * 30)  # 30 days retention
                 await pipe.execute()
@@ -1,7 +1,9 @@
 import asyncio
+import time
 from typing import Dict, Optional, List
 import uuid
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
 # Import pipeline components
 from .audio_pipeline import AudioProcessor
@@ -15,6 +17,15 @@ import structlog
 logger = structlog.get_logger()
 
 
+@dataclass(slots=True)
+class SessionInfo:
+    user_id: str
+    created_at: str
+    last_activity: float
+    message_count: int = 0
+    voice_id: str = "default"
+
+
 class PipelineOrchestrator:
     def __init__(
         self,
@@ -34,7 +45,7 @@ class PipelineOrchestrator:
         self.enable_monitoring = enable_monitoring
 
         # Runtime state
-        self.active_sessions: Dict[str, Dict] = {}
+        self.active_sessions: Dict[str, SessionInfo] = {}
         self.monitoring_data = {
             "requests_processed": 0,
             "audio_chunks_processed": 0,
@@ -43,6 +54,7 @@ class PipelineOrchestrator:
             "errors": 0,
             "avg_processing_time": 0,
         }
+        self._monitor_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """Initialize all pipeline components"""
@@ -50,8 +62,19 @@ class PipelineOrchestrator:
         await self.ml_pipeline.initialize()
 
         # Start monitoring task if enabled
-        if self.enable_monitoring:
-            asyncio.create_task(self._monitoring_task())
+        if self.enable_monitoring and self._monitor_task is None:
+            self._monitor_task = asyncio.create_task(self._monitoring_task())
+
+    async def shutdown(self):
+        """Release long-lived pipeline resources"""
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            await asyncio.gather(self._monitor_task, return_exceptions=True)
+            self._monitor_task = None
+
+        await self.ml_pipeline.aclose()
+        await self.speech_to_text.aclose()
+        await self.response_generator.aclose()
 
     async def process_audio_stream(self, audio_stream, session_id: str, user_id: str):
         """Process incoming audio stream"""
@@ -93,7 +116,7 @@ class PipelineOrchestrator:
         self._register_session(session_id, user_id)
 
         try:
-            start_time = asyncio.get_event_loop().time()
+            start_time = time.monotonic()
 
             # Create message
             message = Message(
@@ -112,7 +135,7 @@ class PipelineOrchestrator:
             response = await self._generate_response(context, session_id, user_id)
 
             # Update monitoring
-            end_time = asyncio.get_event_loop().time()
+            end_time = time.monotonic()
             self._update_monitoring(end_time - start_time)
 
             return response
@@ -124,12 +147,12 @@ class PipelineOrchestrator:
     async def _generate_response(
         self, context: List[Message], session_id: str, user_id: str
     ):
-        """Generate AI response based on context"""
+        """Generate AI response based on context, with audio as an async iterator"""
         try:
             # Format messages for ML model
-            formatted_context = []
-            for msg in context:
-                formatted_context.append({"role": msg.role, "content": msg.content})
+            formatted_context = [
+                {"role": msg.role, "content": msg.content} for msg in context
+            ]
 
             # Create ML request
             request_id = f"req-{uuid.uuid4()}"
@@ -140,7 +163,7 @@ class PipelineOrchestrator:
                 request_id=request_id,
                 model_name="gpt-4",  # This can be configurable
                 parameters={},
-                timestamp=asyncio.get_event_loop().time(),
+                timestamp=time.monotonic(),
             )
 
             # Get response from ML model
@@ -165,18 +188,15 @@ class PipelineOrchestrator:
 
             # Generate audio response
             self.monitoring_data["tts_requests"] += 1
-            voice_id = self.active_sessions[session_id].get("voice_id", "default")
-
-            audio_responses = []
-            async for audio_chunk in self.response_generator.generate_audio_response(
-                ml_response, voice_id
-            ):
-                audio_responses.append(audio_chunk)
+            voice_id = self.active_sessions[session_id].voice_id
 
-            # Return complete response
+            # Hand back the TTS stream itself so audio chunks reach the client
+            # as they are synthesized instead of after the whole utterance
             return {
                 "text_response": assistant_message,
-                "audio_response": audio_responses,
+                "audio_response": self.response_generator.generate_audio_response(
+                    ml_response, voice_id
+                ),
             }
 
         except Exception as e:
@@ -186,21 +206,21 @@ class PipelineOrchestrator:
 
     def _register_session(self, session_id: str, user_id: str):
         """Register a new session or update existing one"""
-        now = datetime.utcnow().isoformat()
+        # Monotonic float: cheap to store and compare in the inactivity sweep
+        now = time.monotonic()
 
-        if session_id not in self.active_sessions:
+        info = self.active_sessions.get(session_id)
+        if info is None:
             # New session
-            self.active_sessions[session_id] = {
-                "user_id": user_id,
-                "created_at": now,
-                "last_activity": now,
-                "message_count": 0,
-                "voice_id": "default",  # Default voice ID
-            }
+            self.active_sessions[session_id] = SessionInfo(
+                user_id=user_id,
+                created_at=datetime.now(timezone.utc).isoformat(),
+                last_activity=now,
+            )
         else:
             # Update existing session
-            self.active_sessions[session_id]["last_activity"] = now
-            self.active_sessions[session_id]["message_count"] += 1
+            info.last_activity = now
+            info.message_count += 1
 
     def _update_monitoring(self, processing_time: float):
         """Update monitoring metrics"""
@@ -228,13 +248,12 @@ class PipelineOrchestrator:
                 logger.info(f"Pipeline stats: {self.monitoring_data}")
 
                 # Check for inactive sessions
-                now = datetime.utcnow()
-                inactive_sessions = []
-
-                for session_id, info in self.active_sessions.items():
-                    last_active = datetime.fromisoformat(info["last_activity"])
-                    if (now - last_active).total_seconds() > 3600:  # 1 hour inactive
-                        inactive_sessions.append(session_id)
+                cutoff = time.monotonic() - 3600  # 1 hour inactive
+                inactive_sessions = [
+                    session_id
+                    for session_id, info in self.active_sessions.items()
+                    if info.last_activity < cutoff
+                ]
 
                 # Clean up inactive sessions
                 for session_id in inactive_sessions:
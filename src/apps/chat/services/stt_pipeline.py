@@ -1,6 +1,9 @@
 import asyncio
+from dataclasses import dataclass, field
+import time
 from typing import List, Dict, AsyncGenerator, Optional
 from pydantic import BaseModel
+from pydantic_core import from_json, to_json
 import httpx
 import structlog
 
@@ -16,6 +19,20 @@ class TranscriptionResult(BaseModel):
     timestamp: float
 
 
+@dataclass(slots=True)
+class _STTSession:
+    sample_rate: int
+    last_sent: float
+    # Audio is appended into one growable buffer instead of keeping a list
+    # of chunk objects per session
+    buffer: bytearray = field(default_factory=bytearray)
+    buffered_chunks: int = 0
+    # (task, user_id, sent_at) of the request in flight, if any
+    pending_request: Optional[tuple] = None
+    # Context returned by the STT service for continuous transcription
+    context: dict = field(default_factory=dict)
+
+
 class SpeechToTextPipeline:
     def __init__(
         self, model_endpoint: str, batch_size: int = 3, max_latency_ms: int = 300
@@ -25,8 +42,28 @@ class SpeechToTextPipeline:
         self.max_latency_ms = max_latency_ms
         self.batch_buffer: Dict[str, List] = {}  # Session ID -> audio chunks
         self.session_state: Dict[
-            str, Dict
+            str, _STTSession
         ] = {}  # Store session state for continuous STT
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client shared by all STT service calls"""
+        return httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
 
     async def process_audio_chunk(
         self, audio_chunk
@@ -35,93 +72,117 @@ class SpeechToTextPipeline:
         session_id = audio_chunk.session_id
 
         # Initialize session state if needed
-        if session_id not in self.session_state:
-            self.session_state[session_id] = {
-                "buffer": [],
-                "last_sent": asyncio.get_event_loop().time(),
-                "pending_request": None,
-            }
+        state = self.session_state.get(session_id)
+        if state is None:
+            state = self.session_state[session_id] = _STTSession(
+                sample_rate=audio_chunk.sample_rate, last_sent=time.monotonic()
+            )
 
         # Add chunk to buffer
-        self.session_state[session_id]["buffer"].append(audio_chunk)
+        state.buffer += audio_chunk.data
+        state.buffered_chunks += 1
 
         # Check if we should process now
-        current_time = asyncio.get_event_loop().time()
-        buffer_size = len(self.session_state[session_id]["buffer"])
-        time_since_last_sent = (
-            current_time - self.session_state[session_id]["last_sent"]
-        ) * 1000
-
-        should_process = (
-            buffer_size >= self.batch_size
+        current_time = time.monotonic()
+        time_since_last_sent = (current_time - state.last_sent) * 1000
+
+        # Collect the in-flight request once it has finished. Only a final
+        # chunk waits for it; otherwise the caller keeps streaming chunks
+        # into the next batch while the STT service is busy.
+        pending = state.pending_request
+        if pending is not None and (pending[0].done() or audio_chunk.is_final):
+            state.pending_request = None
+            task, user_id, sent_at = pending
+            result = await task
+            if result:
+                yield TranscriptionResult(
+                    text=result["text"],
+                    confidence=result["confidence"],
+                    is_final=False,
+                    user_id=user_id,
+                    session_id=session_id,
+                    timestamp=sent_at,
+                )
+            pending = None
+
+        # One request in flight at a time keeps batches in order and lets
+        # each request carry the context returned by the previous one
+        should_process = pending is None and (
+            state.buffered_chunks >= self.batch_size
             or time_since_last_sent >= self.max_latency_ms
             or audio_chunk.is_final
         )
 
         if should_process:
-            # Process the buffered chunks
-            buffer = self.session_state[session_id]["buffer"]
-            self.session_state[session_id]["buffer"] = []
-            self.session_state[session_id]["last_sent"] = current_time
-
-            # Create a task for the API request
-            if self.session_state[session_id]["pending_request"]:
-                # Wait for previous request to finish to maintain proper sequence
-                await self.session_state[session_id]["pending_request"]
-
-            task = asyncio.create_task(self._send_to_stt_service(buffer, session_id))
-            self.session_state[session_id]["pending_request"] = task
-
-            # Wait for the result
+            # Process the buffered audio
+            audio = self._take_buffer(state)
+            state.last_sent = current_time
+
+            task = asyncio.create_task(
+                self._send_to_stt_service(audio, audio_chunk.sample_rate, session_id)
+            )
+            if not audio_chunk.is_final:
+                state.pending_request = (task, audio_chunk.user_id, current_time)
+                return
+
+            # Wait for the final result
             result = await task
-            self.session_state[session_id]["pending_request"] = None
-
             if result:
                 yield TranscriptionResult(
                     text=result["text"],
                     confidence=result["confidence"],
-                    is_final=audio_chunk.is_final,
+                    is_final=True,
                     user_id=audio_chunk.user_id,
                     session_id=session_id,
                     timestamp=current_time,
                 )
 
-    async def _send_to_stt_service(self, audio_chunks, session_id) -> Optional[Dict]:
+    @staticmethod
+    def _take_buffer(state: _STTSession) -> bytes:
+        """Return the session's buffered audio and reset the buffer"""
+        audio = bytes(state.buffer)
+        state.buffer.clear()
+        state.buffered_chunks = 0
+        return audio
+
+    async def _send_to_stt_service(
+        self, audio: bytes, sample_rate: int, session_id: str
+    ) -> Optional[Dict]:
         """Send audio data to STT service and get transcription result"""
         try:
-            # Combine audio chunks into a single payload
-            combined_audio = b"".join([chunk.data for chunk in audio_chunks])
-
             # Get session context for continuous transcription
-            session_context = self.session_state[session_id].get("context", {})
+            session_context = self.session_state[session_id].context
 
-            # Prepare the request payload
-            payload = {
-                "audio_data": combined_audio.hex(),  # Convert bytes to hex string
-                "sample_rate": audio_chunks[0].sample_rate,
+            # Send the raw audio as a multipart file with metadata as form
+            # fields, rather than hex-encoding it into a JSON body
+            files = {"audio": ("chunk.raw", audio, "application/octet-stream")}
+            data = {
+                "sample_rate": str(sample_rate),
                 "session_id": session_id,
-                "context": session_context,
+                "context": to_json(session_context),
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.model_endpoint, json=payload)
-
-                if response.status_code == 200:
-                    result = response.json()
-
-                    # Save context for next request
-                    if "context" in result:
-                        self.session_state[session_id]["context"] = result["context"]
-
-                    return {
-                        "text": result["text"],
-                        "confidence": result.get("confidence", 1.0),
-                    }
-                else:
-                    logger.error(
-                        f"STT service error: {response.status_code}, {response.text}"
-                    )
-                    return None
+            response = await self.client.post(
+                self.model_endpoint, files=files, data=data
+            )
+
+            if response.status_code == 200:
+                # Parse the raw bytes with pydantic's Rust JSON parser
+                result = from_json(response.content)
+
+                # Save context for next request
+                if "context" in result:
+                    self.session_state[session_id].context = result["context"]
+
+                return {
+                    "text": result["text"],
+                    "confidence": result.get("confidence", 1.0),
+                }
+            else:
+                logger.error(
+                    f"STT service error: {response.status_code}, {response.text}"
+                )
+                return None
 
         except Exception as e:
             logger.error(f"Error in STT processing: {str(e)}")
@@ -129,20 +190,17 @@ class SpeechToTextPipeline:
 
     async def terminate_session(self, session_id: str):
         """Clean up resources for a session"""
-        if session_id in self.session_state:
-            # Process any remaining audio in the buffer with final flag
-            if self.session_state[session_id]["buffer"]:
-                # Mark the last chunk as final
-                self.session_state[session_id]["buffer"][-1].is_final = True
-
-                # Process remaining audio
-                async for result in self.process_audio_chunk(
-                    self.session_state[session_id]["buffer"][-1]
-                ):
-                    # Return or handle the final result
-                    pass
+        state = self.session_state.get(session_id)
+        if state is not None:
+            # Let an in-flight request finish first to keep ordering
+            if state.pending_request:
+                await state.pending_request[0]
+
+            # Process any remaining audio in the buffer
+            if state.buffer:
+                await self._send_to_stt_service(
+                    self._take_buffer(state), state.sample_rate, session_id
+                )
 
             # Clean up session state
-            if self.session_state[session_id]["pending_request"]:
-                await self.session_state[session_id]["pending_request"]
             del self.session_state[session_id]
@@ -1,8 +1,13 @@
 import asyncio
-from typing import Dict, List, Any, Union, AsyncGenerator
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Union, AsyncGenerator
 from pydantic import BaseModel
+import cachetools
+import hashlib
 import httpx
 import logging
+import struct
 import time
 import wave
 import io
@@ -28,6 +33,11 @@ class TTSResponse(BaseModel):
     text: str
 
 
+@dataclass(slots=True)
+class _TTSSession:
+    last_activity: float
+
+
 class ResponseGenerator:
     def __init__(
         self,
@@ -35,12 +45,38 @@ class ResponseGenerator:
         enable_streaming: bool = True,
         chunk_size_chars: int = 100,
         audio_buffer_size: int = 3,
+        cache_max_bytes: int = 32 * 1024 * 1024,
     ):
         self.tts_endpoint = tts_endpoint
         self.enable_streaming = enable_streaming
         self.chunk_size_chars = chunk_size_chars
         self.audio_buffer_size = audio_buffer_size
-        self.session_info = {}
+        self.session_info: Dict[str, _TTSSession] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        # (voice_id, text digest) -> (audio_data, duration, sample_rate),
+        # bounded by total audio bytes and evicted least recently used
+        self._tts_cache = cachetools.LRUCache(
+            maxsize=cache_max_bytes, getsizeof=lambda entry: len(entry[0])
+        )
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client shared by all TTS service calls"""
+        return httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
 
     async def generate_audio_response(
         self, ml_response, voice_id: str = "default"
@@ -51,42 +87,45 @@ class ResponseGenerator:
         request_id = ml_response.request_id
 
         # Track session
-        if session_id not in self.session_info:
-            self.session_info[session_id] = {
-                "last_activity": time.time(),
-                "audio_queue": asyncio.Queue(maxsize=self.audio_buffer_size),
-            }
+        info = self.session_info.get(session_id)
+        if info is None:
+            self.session_info[session_id] = _TTSSession(last_activity=time.time())
         else:
-            self.session_info[session_id]["last_activity"] = time.time()
+            info.last_activity = time.time()
 
         if self.enable_streaming and len(text) > self.chunk_size_chars:
             # Stream response in chunks for better user experience
             chunks = self._split_text_into_chunks(text)
 
-            for i, chunk in enumerate(chunks):
-                tts_request = TTSRequest(
-                    text=chunk,
-                    voice_id=voice_id,
-                    session_id=session_id,
-                    request_id=f"{request_id}-{i}",
-                    parameters={
-                        "is_streaming": True,
-                        "chunk_index": i,
-                        "total_chunks": len(chunks),
-                    },
-                )
-
-                chunk_response = await self._send_tts_request(tts_request)
-
-                # Add to the queue for buffer management
-                await self.session_info[session_id]["audio_queue"].put(chunk_response)
+            # Synthesize up to audio_buffer_size chunks ahead of the consumer
+            # so their TTS round trips overlap; results are yielded in order
+            in_flight = deque()
+            try:
+                for i, chunk in enumerate(chunks):
+                    tts_request = TTSRequest(
+                        text=chunk,
+                        voice_id=voice_id,
+                        session_id=session_id,
+                        request_id=f"{request_id}-{i}",
+                        parameters={
+                            "is_streaming": True,
+                            "chunk_index": i,
+                            "total_chunks": len(chunks),
+                        },
+                    )
+                    in_flight.append(
+                        asyncio.create_task(self._send_tts_request(tts_request))
+                    )
 
-                # Yield the audio data
-                yield chunk_response
+                    if len(in_flight) >= self.audio_buffer_size:
+                        yield await in_flight.popleft()
 
-                # If queue is full, wait for some consumption
-                if self.session_info[session_id]["audio_queue"].full():
-                    await asyncio.sleep(0.1)
+                while in_flight:
+                    yield await in_flight.popleft()
+            finally:
+                # The consumer stopped early or a chunk failed
+                for task in in_flight:
+                    task.cancel()
         else:
             # Single request for shorter text
             tts_request = TTSRequest(
@@ -140,38 +179,69 @@ class ResponseGenerator:
 
     async def _send_tts_request(self, tts_request: TTSRequest) -> TTSResponse:
         """Send request to TTS service"""
+        # Identical text in the same voice synthesizes to the same audio
+        cache_key = (
+            tts_request.voice_id,
+            hashlib.blake2b(tts_request.text.encode(), digest_size=16).digest(),
+        )
+        cached = self._tts_cache.get(cache_key)
+        if cached is not None:
+            audio_data, duration, sample_rate = cached
+            return TTSResponse(
+                audio_data=audio_data,
+                duration=duration,
+                sample_rate=sample_rate,
+                session_id=tts_request.session_id,
+                request_id=tts_request.request_id,
+                text=tts_request.text,
+            )
+
         try:
-            payload = tts_request.dict()
+            response = await self.client.post(
+                self.tts_endpoint,
+                content=tts_request.model_dump_json(),
+                headers={"content-type": "application/json"},
+            )
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.tts_endpoint, json=payload)
+            if response.status_code == 200:
+                # post() has already buffered the body
+                audio_data = response.content
 
-                if response.status_code == 200:
-                    audio_data = await response.aread()
+                # Parse audio data to get duration and sample rate
+                duration, sample_rate = self._analyze_audio_data(audio_data)
 
-                    # Parse audio data to get duration and sample rate
-                    duration, sample_rate = self._analyze_audio_data(audio_data)
+                try:
+                    self._tts_cache[cache_key] = (audio_data, duration, sample_rate)
+                except ValueError:
+                    # Larger than the whole cache; just don't keep it
+                    pass
 
-                    return TTSResponse(
-                        audio_data=audio_data,
-                        duration=duration,
-                        sample_rate=sample_rate,
-                        session_id=tts_request.session_id,
-                        request_id=tts_request.request_id,
-                        text=tts_request.text,
-                    )
-                else:
-                    error_text = response.text
-                    logger.error(
-                        f"TTS service error: {response.status_code}, {error_text}"
-                    )
-                    raise Exception(f"TTS service error: {response.status_code}")
+                return TTSResponse(
+                    audio_data=audio_data,
+                    duration=duration,
+                    sample_rate=sample_rate,
+                    session_id=tts_request.session_id,
+                    request_id=tts_request.request_id,
+                    text=tts_request.text,
+                )
+            else:
+                error_text = response.text
+                logger.error(f"TTS service error: {response.status_code}, {error_text}")
+                raise Exception(f"TTS service error: {response.status_code}")
         except Exception as e:
             logger.error(f"Error in TTS request: {str(e)}")
             raise
 
     def _analyze_audio_data(self, audio_data: bytes) -> tuple:
         """Extract duration and sample rate from WAV audio data"""
+        # Read the two header fields we need straight from the bytes rather
+        # than wrapping the whole clip in BytesIO for the wave module
+        if audio_data[:4] == b"RIFF" and audio_data[8:12] == b"WAVE":
+            try:
+                return self._parse_wav_header(audio_data)
+            except (struct.error, ValueError, ZeroDivisionError):
+                pass
+
         try:
             with io.BytesIO(audio_data) as audio_io:
                 with wave.open(audio_io, "rb") as wav_file:
@@ -184,17 +254,28 @@ class ResponseGenerator:
             # Return default values
             return 1.0, 16000
 
-    async def clean_session(self, session_id: str):
-        """Clean up resources for a session"""
-        if session_id in self.session_info:
-            # Clear audio queue
-            queue = self.session_info[session_id]["audio_queue"]
-            while not queue.empty():
-                try:
-                    queue.get_nowait()
-                    queue.task_done()
-                except asyncio.QueueEmpty:
+    @staticmethod
+    def _parse_wav_header(audio_data: bytes) -> tuple:
+        """Walk the RIFF chunks for the fmt and data headers"""
+        offset = 12
+        rate = block_align = None
+        while offset + 8 <= len(audio_data):
+            chunk_id = audio_data[offset : offset + 4]
+            (chunk_size,) = struct.unpack_from("<I", audio_data, offset + 4)
+            if chunk_id == b"fmt ":
+                rate, _, block_align = struct.unpack_from(
+                    "<IIH", audio_data, offset + 12
+                )
+            elif chunk_id == b"data":
+                if rate is None:
                     break
+                frames = chunk_size // block_align
+                return frames / float(rate), rate
+            # Chunks are word aligned
+            offset += 8 + chunk_size + (chunk_size & 1)
+        raise ValueError("WAV fmt or data chunk not found")
 
-            # Remove session info
-            del self.session_info[session_id]
+    async def clean_session(self, session_id: str):
+        """Clean up resources for a session"""
+        # Remove session info
+        self.session_info.pop(session_id, None)
@@ -1,13 +1,12 @@
 import hashlib
+import hmac
 import secrets
 import typing
 
 from django.contrib.auth.hashers import (
     BasePasswordHasher,
     check_password,
-    make_password,
 )
-from django.utils.crypto import constant_time_compare, get_random_string
 
 
 def generate_key_pair() -> tuple[str, str]:
@@ -18,7 +17,7 @@ def generate_key_pair() -> tuple[str, str]:
 
 
 def concatenate(left: str, right: str) -> str:
-    return "{}.{}".format(left, right)
+    return f"{left}.{right}"
 
 
 def split(concatenated: str) -> typing.Tuple[str, str]:
@@ -28,6 +27,7 @@ def split(concatenated: str) -> typing.Tuple[str, str]:
 
 class Sha512ApiKeyHasher(BasePasswordHasher):
     algorithm = "sha512"
+    digest = hashlib.sha512
 
     def salt(self) -> str:
         """No need for a salt on a high entropy key."""
@@ -36,29 +36,51 @@ class Sha512ApiKeyHasher(BasePasswordHasher):
     def encode(self, password: str, salt: str) -> str:
         if salt != "":
             raise ValueError("salt is unnecessary for high entropy API tokens.")
-        hash = hashlib.sha512(password.encode()).hexdigest()
+        hash = self.digest(password.encode()).hexdigest()
         return "%s$$%s" % (self.algorithm, hash)
 
     def verify(self, password: str, encoded: str) -> bool:
-        encoded_2 = self.encode(password, "")
-        return constant_time_compare(encoded, encoded_2)
+        # Compare raw digests rather than re-encoding to a hex string
+        algorithm, _, hash = encoded.partition("$$")
+        if algorithm != self.algorithm:
+            return False
+        try:
+            expected = bytes.fromhex(hash)
+        except ValueError:
+            return False
+        return hmac.compare_digest(self.digest(password.encode()).digest(), expected)
+
+
+class Sha256ApiKeyHasher(Sha512ApiKeyHasher):
+    """SHA-256 is hardware accelerated (SHA-NI / ARMv8) where SHA-512 is not."""
+
+    algorithm = "sha256"
+    digest = hashlib.sha256
 
 
 class KeyGenerator:
-    preferred_hasher = Sha512ApiKeyHasher()
+    preferred_hasher = Sha256ApiKeyHasher()
+    # Earlier simple hashers, still accepted and upgraded on verification
+    legacy_hashers = (Sha512ApiKeyHasher(),)
 
     def __init__(self, prefix_length: int = 8, secret_key_length: int = 32):
         self.prefix_length = prefix_length
         self.secret_key_length = secret_key_length
+        # Keys are never empty, so make_password's unusable-password handling
+        # and hasher lookup can be skipped in favour of the bound encoder
+        self._encode = self.preferred_hasher.encode
+        self._preferred_prefix = f"{self.preferred_hasher.algorithm}$$"
 
+    # token_urlsafe draws all the entropy in one call and base64-encodes it in
+    # C; n bytes give at least n characters, and "." never appears in output.
     def get_prefix(self) -> str:
-        return get_random_string(self.prefix_length)
+        return secrets.token_urlsafe(self.prefix_length)[: self.prefix_length]
 
     def get_secret_key(self) -> str:
-        return get_random_string(self.secret_key_length)
+        return secrets.token_urlsafe(self.secret_key_length)[: self.secret_key_length]
 
     def hash(self, value: str) -> str:
-        return make_password(value, hasher=self.preferred_hasher)
+        return self._encode(value, "")
 
     def generate(self) -> typing.Tuple[str, str, str]:
         prefix = self.get_prefix()
@@ -71,6 +93,9 @@ class KeyGenerator:
         if self.using_preferred_hasher(hashed_key):
             # New simpler hasher
             result = self.preferred_hasher.verify(key, hashed_key)
+        elif legacy_hasher := self._get_legacy_hasher(hashed_key):
+            # Django does not know these, so check_password would reject them
+            result = legacy_hasher.verify(key, hashed_key)
         else:
             # Slower password hashers from Django
             # If verified, these will be transparently updated to the preferred hasher
@@ -79,4 +104,12 @@ class KeyGenerator:
         return result
 
     def using_preferred_hasher(self, hashed_key: str) -> bool:
-        return hashed_key.startswith(f"{self.preferred_hasher.algorithm}$$")
+        return hashed_key.startswith(self._preferred_prefix)
+
+    def _get_legacy_hasher(
+        self, hashed_key: str
+    ) -> typing.Optional[BasePasswordHasher]:
+        for hasher in self.legacy_hashers:
+            if hashed_key.startswith(f"{hasher.algorithm}$$"):
+                return hasher
+        return None
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.tokens.models import WebSocketToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired WebSocket tokens. "
+        "Meant to be run periodically, e.g. every minute from cron."
+    )
+
+    def handle(self, *args, **options):
+        deleted = WebSocketToken.delete_expired()
+        self.stdout.write(f"Deleted {deleted} expired WebSocket tokens")
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-15 20:25
+
+import apps.tokens.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tokens", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="websockettoken",
+            name="expires_at",
+            field=models.DateTimeField(
+                db_index=True, default=apps.tokens.models._websocket_token_expiry
+            ),
+        ),
+    ]
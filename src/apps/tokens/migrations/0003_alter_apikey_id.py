@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-15 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tokens", "0002_websockettoken_expires_at"),
+    ]
+
+    # primary_key already implies uniqueness and no separate index was ever
+    # created, so this only updates the migration state.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="apikey",
+                    name="id",
+                    field=models.CharField(
+                        editable=False,
+                        max_length=150,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,7 +1,10 @@
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
 import secrets
+import threading
 import typing
-from asgiref.sync import sync_to_async
+import cachetools
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
@@ -10,10 +13,67 @@ from .crypto import KeyGenerator, concatenate, split
 from apps.chat.models import ChatUser
 from core.models import Instance
 
+logger = logging.getLogger(__name__)
+
+
+# Usable keys by (model, prefix), so repeated requests with the same key skip
+# the lookup query. Entries are dropped by the save/delete signals and by
+# queryset updates; the TTL bounds staleness for changes made by other processes.
+API_KEY_CACHE_TTL_SECONDS = 30
+
+_API_KEY_CACHE: cachetools.TTLCache = cachetools.TTLCache(
+    maxsize=4096, ttl=API_KEY_CACHE_TTL_SECONDS
+)
+_API_KEY_CACHE_LOCK = threading.Lock()
+
+
+class _CachedAPIKey(typing.NamedTuple):
+    """Columns verification and request auth read, in model field order"""
+
+    id: str
+    prefix: str
+    hashed_key: str
+    name: str
+    revoked: bool
+    expiry_date: typing.Optional[datetime]
+
+
+def invalidate_api_key(model: typing.Type["AbstractAPIKey"], prefix: str) -> None:
+    """Drop an API key from the cache"""
+    with _API_KEY_CACHE_LOCK:
+        _API_KEY_CACHE.pop((model, prefix), None)
+
+
+# Hashes upgraded to the preferred hasher are written off the request path.
+# The old hash keeps verifying until the update lands, so this is safe to lose.
+_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apikey")
+
+
+def _store_rehashed_key(
+    model: typing.Type["AbstractAPIKey"], pk: str, hashed_key: str
+) -> None:
+    try:
+        model.objects.filter(pk=pk).update(hashed_key=hashed_key)
+    except Exception as e:
+        logger.error("Failed to store upgraded API key hash: %s", e)
+
+
+class APIKeyQuerySet(models.QuerySet):
+    def update(self, **kwargs: typing.Any) -> int:
+        # Bulk updates send no signals, so drop the affected keys from the cache
+        prefixes = list(self.values_list("prefix", flat=True))
+        rows = super().update(**kwargs)
+        for prefix in prefixes:
+            invalidate_api_key(self.model, prefix)
+        return rows
+
 
 class BaseAPIKeyManager(models.Manager):
     key_generator = KeyGenerator()
 
+    def get_queryset(self) -> APIKeyQuerySet:
+        return APIKeyQuerySet(self.model, using=self._db)
+
     def assign_key(self, obj: "AbstractAPIKey") -> str:
         try:
             key, prefix, hashed_key = self.key_generator.generate()
@@ -44,36 +104,72 @@ class BaseAPIKeyManager(models.Manager):
     def get_usable_keys(self) -> models.QuerySet:
         return self.filter(revoked=False)
 
-    def get_from_key(self, key: str) -> "AbstractAPIKey":
+    def _get_usable_key(self, key: str) -> _CachedAPIKey:
+        """Look up the key by its prefix, without verifying it"""
         prefix, _, _ = key.partition(".")
-        queryset = self.get_usable_keys()
+        cache_key = (self.model, prefix)
+        with _API_KEY_CACHE_LOCK:
+            cached = _API_KEY_CACHE.get(cache_key)
+
+        if cached is None:
+            # Raises DoesNotExist for unknown or revoked keys
+            cached = _CachedAPIKey._make(
+                self.get_usable_keys()
+                .values_list(*_CachedAPIKey._fields)
+                .get(prefix=prefix)
+            )
+            with _API_KEY_CACHE_LOCK:
+                _API_KEY_CACHE[cache_key] = cached
+
+        return cached
+
+    def _verify(self, key: str, cached: _CachedAPIKey) -> bool:
+        """Check the key against a cached row, upgrading outdated hashes"""
+        key_generator = self.key_generator
+        valid = key_generator.verify(key, cached.hashed_key)
+
+        if valid and not key_generator.using_preferred_hasher(cached.hashed_key):
+            # Cache entries are replaced, never mutated, as other threads may
+            # be reading them
+            hashed_key = key_generator.hash(key)
+            with _API_KEY_CACHE_LOCK:
+                _API_KEY_CACHE[(self.model, cached.prefix)] = cached._replace(
+                    hashed_key=hashed_key
+                )
+            _rehash_executor.submit(
+                _store_rehashed_key, self.model, cached.id, hashed_key
+            )
 
-        try:
-            api_key = queryset.get(prefix=prefix)
-        except self.model.DoesNotExist:
-            raise  # For the sake of being explicit.
+        return valid
 
-        if not api_key.is_valid(key):
+    def get_from_key(self, key: str) -> "AbstractAPIKey":
+        cached = self._get_usable_key(key)
+
+        if not self._verify(key, cached):
             raise self.model.DoesNotExist("Key is not valid.")
-        else:
-            return api_key
+
+        # Every caller gets its own instance, built from the cached columns
+        return self.model.from_db(self.db, _CachedAPIKey._fields, cached)
 
     def is_valid(self, key: str) -> bool:
         try:
-            api_key = self.get_from_key(key)
+            cached = self._get_usable_key(key)
         except self.model.DoesNotExist:
             return False
 
-        if api_key.has_expired:
+        # Cheap checks first, so unusable keys never reach the hash
+        if cached.revoked:
+            return False
+        if cached.expiry_date is not None and cached.expiry_date < timezone.now():
             return False
 
-        return True
+        return self._verify(key, cached)
 
 
 class AbstractAPIKey(models.Model):
     objects = BaseAPIKeyManager()
 
-    id = models.CharField(max_length=150, unique=True, primary_key=True, editable=False)
+    id = models.CharField(max_length=150, primary_key=True, editable=False)
     prefix = models.CharField(max_length=8, unique=True, editable=False)
     hashed_key = models.CharField(max_length=150, editable=False)
     created = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -112,10 +208,24 @@ class AbstractAPIKey(models.Model):
         verbose_name = "API key"
         verbose_name_plural = "API keys"
 
-    def __init__(self, *args: typing.Any, **kwargs: typing.Any):
-        super().__init__(*args, **kwargs)
+    # Defaults for instances that were not loaded from the database
+    _initial_revoked = False
+    _uses_preferred_hasher = True
+
+    @classmethod
+    def from_db(
+        cls, db: str, field_names: typing.Any, values: typing.Any
+    ) -> "AbstractAPIKey":
+        instance = super().from_db(db, field_names, values)
         # Store the initial value of `revoked` to detect changes.
-        self._initial_revoked = self.revoked
+        instance._initial_revoked = instance.revoked
+        # Check the hasher once per loaded key instead of on every
+        # verification (read from __dict__ so a deferred field stays deferred).
+        hashed_key = instance.__dict__.get("hashed_key")
+        instance._uses_preferred_hasher = not hashed_key or (
+            cls.objects.key_generator.using_preferred_hasher(hashed_key)
+        )
+        return instance
 
     def _has_expired(self) -> bool:
         if self.expiry_date is None:
@@ -132,12 +242,15 @@ class AbstractAPIKey(models.Model):
 
         # Transparently update the key to use the preferred hasher
         # if it is using an outdated hasher.
-        if valid and not key_generator.using_preferred_hasher(self.hashed_key):
+        if valid and not self._uses_preferred_hasher:
             # Note that since the PK includes the hashed key,
             # they will be internally inconsistent following this upgrade.
             # See: https://github.com/florimondmanca/djangorestframework-api-key/issues/128
             self.hashed_key = key_generator.hash(key)
-            self.save()
+            self._uses_preferred_hasher = True
+            _rehash_executor.submit(
+                _store_rehashed_key, type(self), self.pk, self.hashed_key
+            )
 
         return valid
 
@@ -162,11 +275,21 @@ class APIKey(AbstractAPIKey):
     pass
 
 
+def _websocket_token_expiry():
+    return timezone.now() + WebSocketToken.LIFETIME
+
+
 class WebSocketToken(models.Model):
+    LIFETIME = timedelta(seconds=15)
+    # Leaves a reused token at least 5s of its lifetime to connect with
+    REUSE_WINDOW = timedelta(seconds=10)
+
     user = models.ForeignKey(ChatUser, on_delete=models.CASCADE)
     instance = models.ForeignKey(Instance, on_delete=models.CASCADE)
     token = models.CharField(max_length=150, unique=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Stored at insert so validation is a single comparison
+    expires_at = models.DateTimeField(default=_websocket_token_expiry, db_index=True)
     used = models.BooleanField(default=False)
 
     class Meta:  # noqa
@@ -175,39 +298,47 @@ class WebSocketToken(models.Model):
         verbose_name = "WebSocket token"
         verbose_name_plural = "WebSocket tokens"
 
+    @classmethod
+    def _reusable_tokens(cls, user) -> models.QuerySet:
+        """Unused tokens recent enough to hand out again to the same user"""
+        return cls.objects.filter(
+            user=user,
+            instance=user.instance,
+            used=False,
+            created_at__gt=timezone.now() - cls.REUSE_WINDOW,
+        )
+
     @classmethod
     def generate_token(cls, user):
+        # Reconnect bursts get the token issued moments ago instead of a new row
+        token_obj = cls._reusable_tokens(user).first()
+        if token_obj is not None:
+            return token_obj
+
         # Generate a secure random token
         token = secrets.token_urlsafe(32)
 
-        # Clean up old tokens for this user
-        cls.objects.filter(
-            instance=user.instance,
-            user=user,
-            created_at__lt=timezone.now() - timedelta(seconds=15),
-        ).delete()
-
-        # Create new token
+        # Expired tokens are removed in bulk by the cleanup_ws_tokens command
         return cls.objects.create(token=token, user=user, instance=user.instance)
 
     @classmethod
     async def agenerate_token(cls, user):
+        # Reconnect bursts get the token issued moments ago instead of a new row
+        token_obj = await cls._reusable_tokens(user).afirst()
+        if token_obj is not None:
+            return token_obj
+
         # Generate a secure random token
         token = secrets.token_urlsafe(32)
 
-        # Clean up old tokens for this user
-        await sync_to_async(
-            cls.objects.filter(
-                instance=user.instance,
-                user=user,
-                created_at__lt=timezone.now() - timedelta(seconds=15),
-            ).delete
-        )()
-
-        # Create new token
+        # Expired tokens are removed in bulk by the cleanup_ws_tokens command
         return await cls.objects.acreate(token=token, user=user, instance=user.instance)
 
+    @classmethod
+    def delete_expired(cls) -> int:
+        """Delete every token past its lifetime, returning the count"""
+        deleted, _ = cls.objects.filter(expires_at__lt=timezone.now()).delete()
+        return deleted
+
     def is_valid(self):
-        now = timezone.now()
-        expiration = self.created_at + timedelta(seconds=15)
-        return not self.used and now < expiration
+        return not self.used and timezone.now() < self.expires_at
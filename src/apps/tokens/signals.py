@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import APIKey, invalidate_api_key
+
+
+@receiver([post_save, post_delete], sender=APIKey)
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    invalidate_api_key(sender, instance.prefix)
@@ -10,18 +10,14 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 # is populated before importing code that may import ORM models.
 django_asgi_app = get_asgi_application()
 
-
-def get_websocket_application():
-    """Get WebSocket application after Django is initialized"""
-    # Import WebSocket routing after Django is set up to avoid circular imports
-    from websocket.routing import websocket_urlpatterns
-
-    return AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+# WebSocket routing imports consumers and models, so it must come after the
+# app registry is ready; importing here still surfaces errors at startup.
+from websocket.routing import websocket_urlpatterns  # noqa: E402
 
 
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
-        "websocket": get_websocket_application(),
+        "websocket": AuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
     }
 )
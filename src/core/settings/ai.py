@@ -0,0 +1,13 @@
+"""
+AI inference settings
+"""
+import os
+
+# Inference requests arriving within AI_BATCH_WINDOW_MS of each other are
+# dispatched to the model backend together, up to AI_MAX_BATCH_SIZE at once.
+AI_MAX_BATCH_SIZE = int(
+    os.getenv(f"{ENVVAR_SETTINGS_PREFIX}MAX_BATCH_SIZE", "16")  # noqa: F821
+)
+AI_BATCH_WINDOW_MS = float(
+    os.getenv(f"{ENVVAR_SETTINGS_PREFIX}BATCH_WINDOW_MS", "10")  # noqa: F821
+)
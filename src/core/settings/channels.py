@@ -4,11 +4,13 @@ Django Channels configuration for WebSocket support
 
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        # Consumers only broadcast to groups, which plain Redis pub/sub covers
+        # without the per-channel lists and expiry bookkeeping of the core layer
+        "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
         "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
-            "capacity": 1500,
-            "expiry": 10,
+            "hosts": [
+                {"address": "redis://127.0.0.1:6379", "max_connections": 64},
+            ],
         },
     },
 }
@@ -1,20 +1,58 @@
+import asyncio
 import logging
+import random
+import struct
+import time
+from datetime import UTC, datetime
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.db import connection, transaction
 from django.utils import timezone
-from django.contrib.auth.models import User
+from pydantic_core import from_json, to_json
 from apps.chat.services.sanitizers import InputSanitizer
 from apps.tokens.models import WebSocketToken
-from apps.chat.models import Chat, Conversation, Thread, Message
+from apps.chat.models import Chat, ChatUser, Conversation, Thread, Message
 
 logger = logging.getLogger(__name__)
 
+# Only the chosen template is formatted
+_MOCK_RESPONSES = (
+    "I understand you're saying: {message}",
+    "That's an interesting point about '{preview}...'",
+    "Let me help you with that. Regarding '{message}', I think...",
+    "Thanks for sharing that. In response to '{message}', here's what I think...",
+)
+
+
+# [formatted_at, iso_string] for _now_iso
+_now_iso_cache = [0.0, ""]
+
+
+def _now_iso() -> str:
+    """Current UTC time in ISO format, reformatted at most once per millisecond"""
+    now = time.time()
+    if now - _now_iso_cache[0] >= 0.001:
+        _now_iso_cache[0] = now
+        _now_iso_cache[1] = datetime.fromtimestamp(now, UTC).isoformat()
+    return _now_iso_cache[1]
+
+
+# Heartbeat replies are formatted directly rather than going through send_json;
+# the ISO timestamp needs no escaping
+_PONG_TEMPLATE = '{"type":"pong","timestamp":"%s"}'
+
+# Binary voice frames: uint16 sequence number, uint16 reserved, uint32 payload
+# length, then the raw audio payload
+_VOICE_FRAME_HEADER = struct.Struct("<HHI")
+
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.user = None
         self.chat_user = None
+        # chat_user's pk, read on every frame
+        self._user_pk = None
         self.room_name = None
         self.room_group_name = None
         self.chat_session = None
@@ -37,10 +75,15 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                 # Setup chat session
                 await self.setup_chat_session(conversation_id)
 
-                # Join room group
+                # Join room group, and this user's own group in the room for
+                # signals addressed to them
                 await self.channel_layer.group_add(
                     self.room_group_name, self.channel_name
                 )
+                if self._user_pk is not None:
+                    await self.channel_layer.group_add(
+                        self.user_group_name(self._user_pk), self.channel_name
+                    )
 
                 await self.accept()
 
@@ -49,7 +92,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                     {
                         "type": "connection_established",
                         "session_id": conversation_id,
-                        "user_id": getattr(self.chat_user, "pk", None),
+                        "user_id": self._user_pk,
                         "message": "Connected successfully",
                     }
                 )
@@ -66,25 +109,29 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             await self.channel_layer.group_discard(
                 self.room_group_name, self.channel_name
             )
+            if self._user_pk is not None:
+                await self.channel_layer.group_discard(
+                    self.user_group_name(self._user_pk), self.channel_name
+                )
         logger.info(f"WebSocket disconnected: {close_code}")
 
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        """Route binary frames to the voice relay, text frames to receive_json"""
+        if bytes_data is not None:
+            await self.handle_voice_frame(bytes_data)
+        else:
+            await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+
     async def receive_json(self, content):
         """Handle incoming WebSocket messages"""
         try:
             message_type = content.get("type")
+            handler = self._HANDLERS.get(message_type)
 
-            if message_type == "chat_message":
-                await self.handle_chat_message(content)
-            elif message_type == "webrtc_signal":
-                await self.handle_webrtc_signal(content)
-            elif message_type == "voice_data":
-                await self.handle_voice_data(content)
-            elif message_type == "typing":
-                await self.handle_typing_indicator(content)
+            if handler is not None:
+                await getattr(self, handler)(content)
             elif message_type == "ping":
-                await self.send_json(
-                    {"type": "pong", "timestamp": timezone.now().isoformat()}
-                )
+                await self.send(text_data=_PONG_TEMPLATE % _now_iso())
             else:
                 await self.send_json(
                     {
@@ -104,61 +151,37 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         try:
             message_content = content.get("message", "")
 
-            # Sanitize input
-            sanitized_content = await database_sync_to_async(
-                self.sanitizer.sanitize_text
-            )(message_content)
+            # Sanitize input inline: text is capped at max_text_length, and even
+            # at the cap the pass is cheaper than a thread-pool hop
+            sanitized_content = self.sanitizer.sanitize_text(message_content)
+
+            # Saving the user message doesn't depend on the AI response, so the
+            # database hop runs while the response is generated
+            async with asyncio.TaskGroup() as tg:
+                user_task = tg.create_task(self.save_user_message(sanitized_content))
+                ai_task = tg.create_task(self.generate_ai_response(sanitized_content))
 
-            # Create thread for this message exchange
-            thread = await self.create_thread()
-            if not thread:
+            user_message = user_task.result()
+            if not user_message:
                 await self.send_json(
-                    {"type": "error", "message": "Failed to create thread"}
+                    {"type": "error", "message": "Failed to save messages"}
                 )
                 return
 
-            # Save user message
-            user_message = await self.save_message(
-                thread=thread, content=sanitized_content, sender="user"
-            )
+            # Broadcast user message to room
+            await self.broadcast_chat_message(user_message)
 
-            if user_message:
-                # Broadcast user message to room
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        "type": "chat_message_broadcast",
-                        "message": {
-                            "id": user_message.id,
-                            "content": sanitized_content,
-                            "sender": "user",
-                            "timestamp": user_message.created_at.isoformat(),
-                        },
-                    },
-                )
-
-                # Generate AI response
-                ai_response_content = await self.generate_ai_response(sanitized_content)
-
-                # Save AI response
-                ai_message = await self.save_message(
-                    thread=thread, content=ai_response_content, sender="assistant"
+            ai_message = await self.save_message(
+                user_message.thread, ai_task.result(), "assistant"
+            )
+            if not ai_message:
+                await self.send_json(
+                    {"type": "error", "message": "Failed to save messages"}
                 )
+                return
 
-                if ai_message:
-                    # Broadcast AI response
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            "type": "chat_message_broadcast",
-                            "message": {
-                                "id": ai_message.id,
-                                "content": ai_response_content,
-                                "sender": "assistant",
-                                "timestamp": ai_message.created_at.isoformat(),
-                            },
-                        },
-                    )
+            # Broadcast AI response to room
+            await self.broadcast_chat_message(ai_message)
 
         except Exception as e:
             logger.error(f"Chat message error: {e}")
@@ -166,6 +189,23 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                 {"type": "error", "message": "Failed to process chat message"}
             )
 
+    async def broadcast_chat_message(self, message):
+        """Send a saved message to the room group"""
+        text = await self.encode_json(
+            {
+                "type": "chat_message",
+                "message": {
+                    "id": message.id,
+                    "content": message.content,
+                    "sender": message.sender,
+                    "timestamp": message.created_at.isoformat(),
+                },
+            }
+        )
+        await self.channel_layer.group_send(
+            self.room_group_name, {"type": "chat_message_broadcast", "text": text}
+        )
+
     async def handle_webrtc_signal(self, content):
         """Handle WebRTC signaling for voice calls"""
         try:
@@ -173,18 +213,31 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             signal_data = content.get("data")
             target_user = content.get("target_user")
 
-            # Broadcast WebRTC signal to room or specific user
-            await self.channel_layer.group_send(
-                self.room_group_name,
+            # Send WebRTC signal to the target user's connections only, or
+            # broadcast to the room if no target is given
+            if type(target_user) is int:
+                group_name = self.user_group_name(target_user)
+            else:
+                group_name = self.room_group_name
+
+            text = await self.encode_json(
                 {
-                    "type": "webrtc_signal_broadcast",
+                    "type": "webrtc_signal",
                     "signal": {
                         "type": signal_type,
                         "data": signal_data,
-                        "from_user": getattr(self.chat_user, "pk", None),
+                        "from_user": self._user_pk,
                         "target_user": target_user,
-                        "timestamp": timezone.now().isoformat(),
+                        "timestamp": _now_iso(),
                     },
+                }
+            )
+            await self.channel_layer.group_send(
+                group_name,
+                {
+                    "type": "webrtc_signal_broadcast",
+                    "target_user": target_user,
+                    "text": text,
                 },
             )
         except Exception as e:
@@ -201,117 +254,180 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                 processed_data = await self.process_voice_data(audio_data, metadata)
 
                 # Broadcast processed voice data
+                text = await self.encode_json(
+                    {
+                        "type": "voice_data",
+                        "data": processed_data,
+                        "from_user": self._user_pk,
+                        "timestamp": _now_iso(),
+                    }
+                )
                 await self.channel_layer.group_send(
                     self.room_group_name,
                     {
                         "type": "voice_data_broadcast",
-                        "data": processed_data,
-                        "from_user": getattr(self.chat_user, "pk", None),
-                        "timestamp": timezone.now().isoformat(),
+                        "from_user": self._user_pk,
+                        "text": text,
                     },
                 )
 
         except Exception as e:
             logger.error(f"Voice data error: {e}")
 
+    async def handle_voice_frame(self, frame):
+        """Relay a binary voice frame to the room without JSON encoding"""
+        try:
+            if len(frame) < _VOICE_FRAME_HEADER.size:
+                return
+            _seq, _reserved, length = _VOICE_FRAME_HEADER.unpack_from(frame)
+            if length != len(frame) - _VOICE_FRAME_HEADER.size:
+                return
+
+            # The frame is forwarded as is; receivers read the header themselves
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    "type": "voice_frame_broadcast",
+                    "bytes": frame,
+                    "from_user": self._user_pk,
+                },
+            )
+        except Exception as e:
+            logger.error(f"Voice frame error: {e}")
+
     async def handle_typing_indicator(self, content):
         """Handle typing indicators"""
         try:
             is_typing = content.get("is_typing", False)
 
+            text = await self.encode_json(
+                {
+                    "type": "typing_indicator",
+                    "user_id": self._user_pk,
+                    "is_typing": is_typing,
+                    "timestamp": _now_iso(),
+                }
+            )
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     "type": "typing_indicator_broadcast",
-                    "user_id": getattr(self.chat_user, "pk", None),
-                    "is_typing": is_typing,
-                    "timestamp": timezone.now().isoformat(),
+                    "user_id": self._user_pk,
+                    "text": text,
                 },
             )
         except Exception as e:
             logger.error(f"Typing indicator error: {e}")
 
-    # Group message handlers
+    # Message type -> handler method name, looked up once per incoming frame
+    # (by name, so subclasses can override handlers)
+    _HANDLERS = {
+        "chat_message": "handle_chat_message",
+        "webrtc_signal": "handle_webrtc_signal",
+        "voice_data": "handle_voice_data",
+        "typing": "handle_typing_indicator",
+    }
+
+    # Frames are encoded and decoded by pydantic_core (Rust) rather than the
+    # stdlib json module
+    @classmethod
+    async def encode_json(cls, content):
+        return to_json(content).decode()
+
+    @classmethod
+    async def decode_json(cls, text_data):
+        return from_json(text_data)
+
+    def user_group_name(self, user_id):
+        """Group of a single user's connections in this room"""
+        return f"{self.room_group_name}_user_{user_id}"
+
+    # Group message handlers. Senders encode the frame once into event["text"],
+    # so each receiving socket only writes it out
     async def chat_message_broadcast(self, event):
         """Send chat message to WebSocket"""
-        await self.send_json({"type": "chat_message", "message": event["message"]})
+        await self.send(text_data=event["text"])
 
     async def webrtc_signal_broadcast(self, event):
         """Send WebRTC signal to WebSocket"""
-        signal = event["signal"]
-        user_id = getattr(self.chat_user, "pk", None)
+        target_user = event["target_user"]
 
         # Only send to target user or broadcast if no target specified
-        if not signal.get("target_user") or signal["target_user"] == user_id:
-            await self.send_json({"type": "webrtc_signal", "signal": signal})
+        if not target_user or target_user == self._user_pk:
+            await self.send(text_data=event["text"])
 
     async def voice_data_broadcast(self, event):
         """Send voice data to WebSocket"""
-        user_id = getattr(self.chat_user, "pk", None)
-        if event.get("from_user") != user_id:  # Don't echo back to sender
-            await self.send_json(
-                {
-                    "type": "voice_data",
-                    "data": event["data"],
-                    "from_user": event["from_user"],
-                    "timestamp": event["timestamp"],
-                }
-            )
+        if event["from_user"] != self._user_pk:  # Don't echo back to sender
+            await self.send(text_data=event["text"])
+
+    async def voice_frame_broadcast(self, event):
+        """Send a binary voice frame to WebSocket"""
+        if event["from_user"] != self._user_pk:  # Don't echo back to sender
+            await self.send(bytes_data=event["bytes"])
 
     async def typing_indicator_broadcast(self, event):
         """Send typing indicator to WebSocket"""
-        user_id = getattr(self.chat_user, "pk", None)
-        if event["user_id"] != user_id:  # Don't send to self
-            await self.send_json(
-                {
-                    "type": "typing_indicator",
-                    "user_id": event["user_id"],
-                    "is_typing": event["is_typing"],
-                    "timestamp": event["timestamp"],
-                }
-            )
+        if event["user_id"] != self._user_pk:  # Don't send to self
+            await self.send(text_data=event["text"])
 
     async def validate_token(self, token):
         """Validate WebSocket token"""
         try:
-            token_obj = await database_sync_to_async(WebSocketToken.objects.get)(
-                token=token
-            )
-
-            is_valid = await database_sync_to_async(token_obj.is_valid)()
-            if not is_valid:
-                return False
-
-            # Mark token as used
-            await database_sync_to_async(lambda: setattr(token_obj, "used", True))()
-            await database_sync_to_async(token_obj.save)()
-
-            # Store user reference
-            self.chat_user = token_obj.user
-            return True
-
-        except WebSocketToken.DoesNotExist:
-            return False
+            chat_user = await self.consume_token(token)
         except Exception as e:
             logger.error(f"Token validation error: {e}")
             return False
 
+        if chat_user is None:
+            return False
+
+        # Store user reference
+        self.chat_user = chat_user
+        self._user_pk = chat_user.pk
+        return True
+
+    @database_sync_to_async
+    def consume_token(self, token):
+        """Mark a valid token as used and return its user, or None"""
+        # The conditional UPDATE is itself the validity check, so a token can
+        # only ever be consumed by one connection; RETURNING hands back the
+        # user in the same statement
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE websocket_tokens SET used = %s"
+                    " WHERE token = %s AND used = %s AND expires_at > %s"
+                    " RETURNING user_id",
+                    [
+                        True,
+                        token,
+                        False,
+                        connection.ops.adapt_datetimefield_value(timezone.now()),
+                    ],
+                )
+                row = cursor.fetchone()
+            if row is None:
+                return None
+            return ChatUser.objects.filter(pk=row[0]).first()
+
     @database_sync_to_async
     def setup_chat_session(self, conversation_id):
         """Get or create chat session and conversation"""
         try:
-            # Create or get Django user
-            username = f"chat_user_{self.chat_user.pk if self.chat_user else 'unknown'}"
-            django_user, created = User.objects.get_or_create(
-                username=username, defaults={"email": f"{username}@example.com"}
-            )
-
-            # Get or create chat
+            # Joining an existing conversation needs one query; its chat comes
+            # with it through the manager's select_related
+            self.conversation = Conversation.objects.filter(id=conversation_id).first()
+            if self.conversation is not None:
+                self.chat_session = self.conversation.chat
+                return True
+
+            # Get or create chat for the chat user's auth user
             self.chat_session, created = Chat.objects.get_or_create(
-                user=django_user, defaults={}
+                user_id=self.chat_user.get_django_user_id(), defaults={}
             )
 
-            # Get or create conversation
+            # Get or create conversation (get covers a concurrent create)
             self.conversation, created = Conversation.objects.get_or_create(
                 id=conversation_id,
                 defaults={"chat": self.chat_session, "is_active": True},
@@ -323,13 +439,20 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             return False
 
     @database_sync_to_async
-    def create_thread(self):
-        """Create a new thread for message exchange"""
+    def save_user_message(self, content):
+        """Save a user message in a new thread"""
         try:
             if self.conversation:
-                return Thread.objects.create(conversation=self.conversation)
+                with transaction.atomic():
+                    thread = Thread.objects.create(conversation=self.conversation)
+                    return Message.objects.create(
+                        conversation=self.conversation,
+                        thread=thread,
+                        content=content,
+                        sender="user",
+                    )
         except Exception as e:
-            logger.error(f"Create thread error: {e}")
+            logger.error(f"Save message error: {e}")
         return None
 
     @database_sync_to_async
@@ -351,16 +474,9 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         """Generate AI response to user message"""
         try:
             # Mock AI response - in production, integrate with actual AI models
-            responses = [
-                f"I understand you're saying: {user_message}",
-                f"That's an interesting point about '{user_message[:50]}...'",
-                f"Let me help you with that. Regarding '{user_message}', I think...",
-                f"Thanks for sharing that. In response to '{user_message}', here's what I think...",  # noqa: E501
-            ]
-
-            import random
-
-            return random.choice(responses)
+            return random.choice(_MOCK_RESPONSES).format(
+                message=user_message, preview=user_message[:50]
+            )
 
         except Exception as e:
             logger.error(f"AI response generation error: {e}")